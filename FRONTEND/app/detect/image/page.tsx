@@ -126,7 +126,7 @@ function ImageDetectionPageContent() {
 
       setResults({ real, fake, ai })
 
-      // heatmap_url is a path like "/uploads/image_heatmaps/xxx_heatmap.png"
+      // heatmap_url is a path like "/heatmap/<token>"; the overlay is rendered when first fetched
       if (data.heatmap_url) {
         setHeatmapUrl(`${BACKEND_URL}${data.heatmap_url}`)
       }
@@ -0,0 +1,203 @@
+"""Admission control and backpressure for the inference endpoints.
+
+Each endpoint gets an ``AdmissionController`` with a concurrency limit and a
+bounded wait queue. Waiting requests are queued per user and slots are
+handed out round-robin across users, so one client submitting a burst
+cannot starve everyone else. When the queue (or the user's share of it) is
+full, or a request has waited longer than ``queue_timeout``, admission
+fails fast with ``AdmissionRejected`` carrying a ``Retry-After`` estimate.
+
+Queue-time statistics are kept for capacity planning (see ``stats``).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; maps to 503 + Retry-After."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("user", "event", "granted", "enqueued_at")
+
+    def __init__(self, user: str):
+        self.user = user
+        self.event = threading.Event()
+        self.granted = False
+        self.enqueued_at = time.perf_counter()
+
+
+class AdmissionController:
+    """Concurrency limit + bounded, per-user fair wait queue for one endpoint."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queue: int,
+        max_queue_per_user: int,
+        queue_timeout: float = 30.0,
+        history: int = 1024,
+    ):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_queue_per_user = max(0, max_queue_per_user)
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # user -> deque of waiters; order of keys is the round-robin order
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._queued = 0
+
+        self._admitted = 0
+        self._rejected: Dict[str, int] = {"queue_full": 0, "user_queue_full": 0, "timeout": 0}
+        self._queue_times: Deque[float] = deque(maxlen=history)
+        self._service_times: Deque[float] = deque(maxlen=history)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    @contextmanager
+    def admit(self, user: Optional[str]):
+        """Context manager holding one concurrency slot for the block's duration."""
+
+        self.acquire(user)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def acquire(self, user: Optional[str]) -> float:
+        """Block until admitted; return the time spent queued in seconds."""
+
+        user = user or "anonymous"
+
+        with self._lock:
+            if self._in_flight < self.max_concurrent and self._queued == 0:
+                self._in_flight += 1
+                self._admitted += 1
+                self._queue_times.append(0.0)
+                return 0.0
+
+            if self._queued >= self.max_queue:
+                self._rejected["queue_full"] += 1
+                raise AdmissionRejected(f"{self.name} queue is full", self._retry_after_locked())
+
+            user_queue = self._queues.get(user)
+            if user_queue is not None and len(user_queue) >= self.max_queue_per_user:
+                self._rejected["user_queue_full"] += 1
+                raise AdmissionRejected(f"Too many queued {self.name} requests for this user", self._retry_after_locked())
+
+            waiter = _Waiter(user)
+            if user_queue is None:
+                user_queue = self._queues[user] = deque()
+            user_queue.append(waiter)
+            self._queued += 1
+
+        waiter.event.wait(self.queue_timeout)
+
+        with self._lock:
+            if not waiter.granted:
+                # Timed out: withdraw from the queue
+                user_queue = self._queues.get(user)
+                if user_queue is not None and waiter in user_queue:
+                    user_queue.remove(waiter)
+                    self._queued -= 1
+                    if not user_queue:
+                        del self._queues[user]
+                self._rejected["timeout"] += 1
+                raise AdmissionRejected(f"Timed out waiting for a {self.name} slot", self._retry_after_locked())
+
+            waited = time.perf_counter() - waiter.enqueued_at
+            self._queue_times.append(waited)
+            return waited
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        """Free a slot and hand it to the next user in round-robin order."""
+
+        with self._lock:
+            if service_time is not None:
+                self._service_times.append(service_time)
+
+            if self._queues:
+                # Pop the user at the head of the rotation, then move them to the back
+                user, user_queue = next(iter(self._queues.items()))
+                waiter = user_queue.popleft()
+                self._queued -= 1
+                if user_queue:
+                    self._queues.move_to_end(user)
+                else:
+                    del self._queues[user]
+                waiter.granted = True
+                self._admitted += 1
+                waiter.event.set()  # slot transfers directly; in_flight unchanged
+            else:
+                self._in_flight -= 1
+
+    @property
+    def queued(self) -> int:
+        """Number of requests currently waiting for a slot."""
+
+        return self._queued
+
+    def stats(self) -> dict:
+        """Snapshot of load and queue-time statistics (seconds)."""
+
+        with self._lock:
+            queue_times = sorted(self._queue_times)
+            service_times = list(self._service_times)
+            return {
+                "endpoint": self.name,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "queued_users": len(self._queues),
+                "admitted_total": self._admitted,
+                "rejected_total": dict(self._rejected),
+                "queue_time_s": {
+                    "p50": _percentile(queue_times, 50),
+                    "p95": _percentile(queue_times, 95),
+                    "p99": _percentile(queue_times, 99),
+                    "max": queue_times[-1] if queue_times else 0.0,
+                    "samples": len(queue_times),
+                },
+                "service_time_s": {
+                    "mean": sum(service_times) / len(service_times) if service_times else 0.0,
+                    "samples": len(service_times),
+                },
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _retry_after_locked(self) -> int:
+        """Seconds until the current queue would drain, at the recent service rate."""
+
+        if self._service_times:
+            mean_service = sum(self._service_times) / len(self._service_times)
+        else:
+            mean_service = 1.0
+        drain = (self._queued + self._in_flight) * mean_service / self.max_concurrent
+        return max(1, int(round(drain)))
+
+
+def _percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
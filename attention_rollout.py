@@ -0,0 +1,124 @@
+"""Forward-only attention-rollout explanations for ViT-B/16.
+
+Grad-CAM needs a backward pass, which roughly doubles the compute per
+explained image and keeps every activation alive for autograd. Attention
+rollout (Abnar & Zuidema, 2020) only needs the attention maps of each
+encoder block, so it is captured during the ``no_grad`` forward that
+produces the prediction: "prediction plus heatmap" costs about one forward.
+
+For each block the head-averaged attention ``A`` is mixed with the
+identity for the residual connection, ``0.5 * A + 0.5 * I``, row
+normalized, and the blocks are multiplied together. The class token's row
+of the product, over the patch tokens, is the heatmap.
+
+Unlike Grad-CAM the result is class-agnostic: it shows what the model
+looked at, not the evidence for one particular class.
+
+torchvision's ``EncoderBlock`` calls its attention with
+``need_weights=False``; a forward pre-hook flips that for the duration of
+the call (requires torch >= 2.0 for keyword-argument hooks).
+"""
+
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+
+def _attention_modules(model: torch.nn.Module) -> List[torch.nn.MultiheadAttention]:
+    encoder = getattr(model, "encoder", None)
+    if encoder is None or not hasattr(encoder, "layers"):
+        raise RuntimeError("Model does not have encoder.layers; unsupported architecture for attention rollout")
+
+    modules = [getattr(block, "self_attention", None) for block in encoder.layers]
+    if not modules or any(not isinstance(m, torch.nn.MultiheadAttention) for m in modules):
+        raise RuntimeError("Encoder blocks have no self_attention; unsupported architecture for attention rollout")
+    return modules
+
+
+def attention_rollout_from_tensor(
+    model: torch.nn.Module,
+    input_tensor: torch.Tensor,
+    resize: Tuple[int, int] = (224, 224),
+    head_fusion: str = "mean",
+) -> Tuple[np.ndarray, torch.Tensor]:
+    """Predict and explain a preprocessed ``(1, 3, H, W)`` tensor in one forward.
+
+    Args:
+        head_fusion: how to combine attention heads, ``mean`` or ``max``
+
+    Returns:
+        ``(heatmap, logits)``: heatmap in [0, 1] of size ``resize``, logits
+        of shape (1, num_classes).
+    """
+
+    heatmaps, logits = attention_rollout_batch(model, input_tensor, resize, head_fusion)
+    return heatmaps[0], logits
+
+
+def attention_rollout_batch(
+    model: torch.nn.Module,
+    input_tensor: torch.Tensor,
+    resize: Tuple[int, int] = (224, 224),
+    head_fusion: str = "mean",
+) -> Tuple[np.ndarray, torch.Tensor]:
+    """Like ``attention_rollout_from_tensor`` for a ``(B, 3, H, W)`` batch.
+
+    Returns:
+        ``(heatmaps, logits)``: heatmaps of shape (B, *resize) in [0, 1],
+        logits of shape (B, num_classes).
+    """
+
+    attentions = []
+
+    def pre_hook(module, args, kwargs):  # pylint: disable=unused-argument
+        kwargs["need_weights"] = True
+        kwargs["average_attn_weights"] = head_fusion == "mean"
+        return args, kwargs
+
+    def hook(module, args, output):  # pylint: disable=unused-argument
+        weights = output[1]
+        if weights.dim() == 4:  # (B, heads, T, T) when not averaged
+            weights = weights.max(dim=1).values
+        attentions.append(weights)
+
+    handles = []
+    for module in _attention_modules(model):
+        handles.append(module.register_forward_pre_hook(pre_hook, with_kwargs=True))
+        handles.append(module.register_forward_hook(hook))
+
+    try:
+        model.eval()
+        with torch.no_grad():
+            logits = model(input_tensor)
+
+            # Roll out the attention through the residual connections
+            rollout = None
+            for attention in attentions:
+                a = attention.float()
+                a = 0.5 * a + 0.5 * torch.eye(a.size(-1), device=a.device)
+                a = a / a.sum(dim=-1, keepdim=True)
+                rollout = a if rollout is None else a @ rollout
+
+            # Class token -> patch tokens
+            masks = rollout[:, 0, 1:].cpu().numpy().astype(np.float32)
+    finally:
+        for handle in handles:
+            handle.remove()
+
+    grid_size = int(np.sqrt(masks.shape[1]))
+    heatmaps = np.empty((masks.shape[0], resize[1], resize[0]), dtype=np.float32)
+    for i, mask in enumerate(masks):
+        mask = mask[: grid_size * grid_size].reshape(grid_size, grid_size)
+        mask = cv2.resize(mask, resize, interpolation=cv2.INTER_CUBIC)
+
+        # Normalize to [0, 1]
+        mask = mask - mask.min()
+        if mask.max() > 0:
+            mask = mask / mask.max()
+        heatmaps[i] = mask
+
+    return heatmaps, logits
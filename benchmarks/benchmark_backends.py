@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+INFERENCE BACKEND BENCHMARK - Pick the fastest backend for this host
+
+Builds every available backend (eager, int8, torchscript, compile, onnx,
+autocast, bf16), checks parity against fp32, times single-image and batched
+forwards next to the fp32 baseline, and records the fastest parity-passing
+backend in model_cache/backend_choice.json so the app can start with
+INFERENCE_BACKEND=auto. Only fp32-parity backends are recorded for auto;
+reduced-precision backends (autocast, bf16) stay opt-in per request, and
+--allow-reduced-precision only reports the fastest of them as a candidate
+for REDUCED_PRECISION.
+
+Usage:
+    python benchmarks/benchmark_backends.py [--iters 20] [--batch 8]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from model_loader import MODEL_PATH, build_transform, load_model
+from inference_backends import (
+    AUTO_BACKENDS,
+    BACKEND_NAMES,
+    EagerBackend,
+    calibration_inputs,
+    create_backend,
+    parity_check,
+    write_backend_choice,
+)
+
+
+def time_forward(backend, batch, iters, warmup=3):
+    """Return per-call latencies in milliseconds."""
+    for _ in range(warmup):
+        backend(batch)
+    timings = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        backend(batch)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--cache-dir", default=os.getenv("MODEL_CACHE_DIR", "model_cache"))
+    parser.add_argument("--backends", default=",".join(BACKEND_NAMES))
+    parser.add_argument("--iters", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--parity-images", default=os.getenv("PARITY_IMAGES_DIR"))
+    parser.add_argument("--min-agreement", type=float, default=float(os.getenv("PARITY_MIN_AGREEMENT", "0.9")))
+    parser.add_argument("--allow-reduced-precision", action="store_true")
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    print("\n" + "=" * 80)
+    print("INFERENCE BACKEND BENCHMARK")
+    print("=" * 80)
+    print(f"    Torch: {torch.__version__}  Device: {device}  Threads: {torch.get_num_threads()}")
+
+    model = load_model(args.model, device)
+    reference = EagerBackend(model, device)
+    inputs = calibration_inputs(build_transform(), args.parity_images)
+
+    single = torch.randn(1, 3, 224, 224)
+    batched = torch.randn(args.batch, 3, 224, 224)
+
+    results = {}
+    for name in [n.strip() for n in args.backends.split(",") if n.strip()]:
+        print(f"\n[{name}]")
+        start = time.perf_counter()
+        backend = create_backend(name, model, device, args.model, cache_dir=args.cache_dir)
+        build_s = time.perf_counter() - start
+        if backend.name != name:
+            print(f"    ✗ Not available on this host")
+            continue
+
+        parity = parity_check(reference, backend, inputs)
+        single_ms = time_forward(backend, single, args.iters)
+        batch_ms = time_forward(backend, batched, max(1, args.iters // 4))
+
+        results[name] = {
+            "build_s": round(build_s, 3),
+            "single_p50_ms": round(statistics.median(single_ms), 3),
+            "batch_p50_ms": round(statistics.median(batch_ms), 3),
+            "batch_images_per_s": round(args.batch * 1000.0 / statistics.median(batch_ms), 2),
+            "class_agreement": parity["class_agreement"],
+            "max_prob_deviation": round(parity["max_prob_deviation"], 6),
+        }
+        r = results[name]
+        print(f"    Build/load: {r['build_s']:.2f}s")
+        print(f"    Single p50: {r['single_p50_ms']:.1f} ms")
+        print(f"    Batch x{args.batch} p50: {r['batch_p50_ms']:.1f} ms ({r['batch_images_per_s']:.1f} img/s)")
+        print(f"    Parity: agreement {r['class_agreement'] * 100:.1f}%, max dev {r['max_prob_deviation']:.4f}")
+        if "eager" in results and name != "eager":
+            print(f"    Speed-up vs fp32: {results['eager']['single_p50_ms'] / r['single_p50_ms']:.2f}x")
+
+    passed = {n: r for n, r in results.items() if r["class_agreement"] >= args.min_agreement}
+    eligible = {n: r for n, r in passed.items() if n in AUTO_BACKENDS}
+    if not eligible:
+        print("\n    ✗ No backend passed the parity check")
+        return 1
+
+    fastest = min(eligible, key=lambda n: eligible[n]["single_p50_ms"])
+    path = write_backend_choice(fastest, results, cache_dir=args.cache_dir)
+
+    print("\n" + "=" * 80)
+    print(f"FASTEST BACKEND: {fastest} ({eligible[fastest]['single_p50_ms']:.1f} ms/image)")
+    print(f"Recorded in {path}; start the app with INFERENCE_BACKEND=auto to use it.")
+    reduced = {n: r for n, r in passed.items() if n not in AUTO_BACKENDS}
+    if args.allow_reduced_precision and reduced:
+        best = min(reduced, key=lambda n: reduced[n]["single_p50_ms"])
+        print(f"Fastest reduced precision: {best} ({reduced[best]['single_p50_ms']:.1f} ms/image); "
+              f"opt in with REDUCED_PRECISION={best} (per request: precision=reduced).")
+    print("=" * 80 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+DECODE BENCHMARK - Full vs reduced-resolution (draft) JPEG decode
+
+For JPEG uploads of increasing size, times decode + transform to the
+model's 224x224 input with a full decode (Image.open().convert('RGB'))
+and with image_decode.decode_image (DCT-domain downscaling), and reports
+the decoded size and the peak memory growth of each decode (measured in a
+fresh child process per case). Also reports the largest difference between the
+two model inputs.
+
+Usage:
+    python benchmarks/benchmark_decode.py [--sizes 1,12,24,48] [--iters 5] [--image photo.jpg]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+from PIL import Image
+
+from image_decode import decode_image
+from model_loader import build_transform
+
+
+def make_jpeg(megapixels, image_path=None):
+    """Encode a 4:3 JPEG of about ``megapixels`` MP (photo-like content)."""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    if image_path:
+        img = Image.open(image_path).convert("RGB").resize((width, height))
+    else:
+        y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+        base = np.stack([200 * x / width, 160 * y / height, 120 * (1 - x / width)], axis=-1)
+        base += 40 * np.sin(x / 37.0)[..., None] * np.cos(y / 53.0)[..., None]
+        img = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def full_decode(data):
+    return Image.open(io.BytesIO(data)).convert("RGB")
+
+
+def draft_decode(data):
+    return decode_image(data)
+
+
+DECODERS = {"full": full_decode, "draft": draft_decode}
+
+
+# Runs in a fresh interpreter that imports only PIL, so the peak is not
+# hidden by torch's import-time high-water mark. VmHWM is per address space
+# (ru_maxrss would carry over the parent's peak across exec).
+_MEMORY_PROBE = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from PIL import Image
+from image_decode import decode_image
+
+def peak_kib():
+    for line in open("/proc/self/status"):
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1])
+
+data = open(sys.argv[2], "rb").read()
+before = peak_kib()
+if sys.argv[3] == "full":
+    img = Image.open(sys.argv[2]).convert("RGB")
+else:
+    img = decode_image(data)
+img.resize((224, 224))
+print((peak_kib() - before) / 1024.0)
+"""
+
+
+def peak_memory_mib(data, decoder):
+    """Peak RSS growth (MiB) of one decode, measured in a child process (Linux only)."""
+    with tempfile.NamedTemporaryFile(suffix=".jpg") as f:
+        f.write(data)
+        f.flush()
+        out = subprocess.run(
+            [sys.executable, "-c", _MEMORY_PROBE, REPO_ROOT, f.name, decoder],
+            capture_output=True, text=True, check=True,
+        )
+    return float(out.stdout.strip())
+
+
+def time_ms(fn, iters):
+    fn()  # warm-up
+    timings = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,12,24,48", help="comma-separated megapixel sizes")
+    parser.add_argument("--iters", type=int, default=5)
+    parser.add_argument("--image", default=None, help="real photo to rescale (default: synthetic)")
+    args = parser.parse_args()
+
+    transform = build_transform()
+
+    print("\n" + "=" * 80)
+    print(f"JPEG DECODE + TRANSFORM TO 224x224 ({args.iters} iterations)")
+    print("=" * 80)
+    print(f"    {'size':>6s} {'decoder':8s} {'decoded':>11s} {'ms':>9s} {'peak MiB':>9s} {'speedup':>8s} {'max diff':>9s}")
+
+    for megapixels in (float(s) for s in args.sizes.split(",")):
+        data = make_jpeg(megapixels, args.image)
+        reference = transform(full_decode(data))
+        base_ms = None
+        for name, decoder in DECODERS.items():
+            img = decoder(data)
+            ms = time_ms(lambda: transform(decoder(data)), args.iters)
+            peak = peak_memory_mib(data, name)
+            diff = (transform(img) - reference).abs().max().item()
+            base_ms = base_ms or ms
+            print(f"    {megapixels:5.0f}M {name:8s} {img.size[0]:5d}x{img.size[1]:<5d} {ms:9.1f} "
+                  f"{peak:9.1f} {base_ms / ms:7.1f}x {diff:9.4f}")
+    print("=" * 80)
+    print("    max diff: largest difference in the normalized model input vs the full decode")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
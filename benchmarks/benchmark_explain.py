@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+EXPLANATION COST BENCHMARK - Grad-CAM vs attention rollout
+
+Times what a "prediction plus heatmap" costs with each explanation method,
+next to a plain prediction:
+
+    forward            no_grad forward only (prediction, no heatmap)
+    forward + gradcam  prediction, then Grad-CAM (forward + backward)
+    gradcam            Grad-CAM alone (its forward also yields the logits)
+    rollout            attention rollout, captured in the prediction forward
+
+Usage:
+    python benchmarks/benchmark_explain.py [--iters 20] [--threads 0]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from model_loader import MODEL_PATH, load_model
+from gradcam_vit import generate_vit_gradcam_from_tensor
+from attention_rollout import attention_rollout_from_tensor
+
+
+def time_ms(fn, iters, warmup=2):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--iters", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    model = load_model(args.model, "cpu")
+    x = torch.randn(1, 3, 224, 224)
+
+    def forward():
+        with torch.no_grad():
+            return model(x)
+
+    def forward_gradcam():
+        forward()
+        return generate_vit_gradcam_from_tensor(model, x)
+
+    cases = [
+        ("forward", forward),
+        ("forward + gradcam", forward_gradcam),
+        ("gradcam", lambda: generate_vit_gradcam_from_tensor(model, x)),
+        ("rollout", lambda: attention_rollout_from_tensor(model, x)),
+    ]
+
+    results = [(name, time_ms(fn, args.iters)) for name, fn in cases]
+    base = statistics.mean(results[0][1])
+
+    print("\n" + "=" * 80)
+    print(f"EXPLANATION COST ({args.iters} iterations, {torch.get_num_threads()} threads)")
+    print("=" * 80)
+    print(f"    {'method':20s} {'mean ms':>9s} {'p50 ms':>9s} {'x forward':>10s}")
+    for name, timings in results:
+        mean = statistics.mean(timings)
+        print(f"    {name:20s} {mean:9.1f} {statistics.median(timings):9.1f} {mean / base:9.2f}x")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
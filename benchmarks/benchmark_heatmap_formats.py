@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+HEATMAP FORMAT BENCHMARK - Encode latency vs file size per overlay format
+
+Builds a Grad-CAM style overlay (from --image, or a synthetic photo-like
+image with a blob heatmap) and times encoding it in every format of
+heatmap_writer.HEATMAP_FORMATS, next to the old default-compression PNG.
+Also times a 30-frame video run written inline vs through HeatmapWriter
+to show how much of the encode the background pool hides.
+
+Usage:
+    python benchmarks/benchmark_heatmap_formats.py [--image face.jpg] [--iters 50]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from gradcam_vit import overlay_heatmap_on_image
+from heatmap_writer import HEATMAP_FORMATS, HeatmapWriter, encode_overlay
+
+
+def synthetic_overlay(size, image_path=None):
+    if image_path:
+        image = Image.open(image_path).convert("RGB")
+    else:
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+        base = np.stack([200 * x, 160 * y, 120 * (1 - x)], axis=-1)
+        base += rng.normal(0, 12, base.shape)
+        image = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    heatmap = np.exp(-((x - 0.4) ** 2 + (y - 0.45) ** 2) / 0.02) + 0.6 * np.exp(-((x - 0.7) ** 2 + (y - 0.3) ** 2) / 0.01)
+    heatmap /= heatmap.max()
+    return overlay_heatmap_on_image(image, heatmap, alpha=0.5)
+
+
+def time_encode(encode, iters):
+    timings = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        data = encode()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings, len(data)
+
+
+def png_default(overlay):
+    buf = io.BytesIO()
+    overlay.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", default=None, help="real image to overlay (default: synthetic)")
+    parser.add_argument("--size", type=int, default=224)
+    parser.add_argument("--iters", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--threads", type=int, default=2)
+    args = parser.parse_args()
+
+    overlay = synthetic_overlay(args.size, args.image)
+
+    print("\n" + "=" * 80)
+    print(f"HEATMAP ENCODING ({overlay.size[0]}x{overlay.size[1]} overlay, {args.iters} iterations)")
+    print("=" * 80)
+    print(f"    {'format':14s} {'mean ms':>8s} {'p95 ms':>8s} {'KiB':>8s}")
+
+    rows = [("png (default)", lambda: png_default(overlay))]
+    rows += [(name, lambda name=name: encode_overlay(overlay, name)) for name in HEATMAP_FORMATS]
+    for name, encode in rows:
+        encode()  # warm-up
+        timings, nbytes = time_encode(encode, args.iters)
+        p95 = sorted(timings)[min(len(timings) - 1, int(0.95 * (len(timings) - 1)))]
+        print(f"    {name:14s} {statistics.mean(timings):8.2f} {p95:8.2f} {nbytes / 1024:8.1f}")
+
+    # Time spent blocked on heatmap output for one video's worth of frames
+    print("\n" + "=" * 80)
+    print(f"VIDEO FRAME OUTPUT ({args.frames} frames, time the caller is blocked)")
+    print("=" * 80)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        for i in range(args.frames):
+            overlay.save(os.path.join(tmp, f"inline_{i}.png"))
+        inline_ms = (time.perf_counter() - start) * 1000.0
+        print(f"    inline png (default)       {inline_ms:8.1f} ms")
+
+        for name in HEATMAP_FORMATS:
+            writer = HeatmapWriter(name, workers=args.threads)
+            start = time.perf_counter()
+            futures = [writer.submit(overlay, os.path.join(tmp, f"{name}_{i}")) for i in range(args.frames)]
+            submit_ms = (time.perf_counter() - start) * 1000.0
+            for future in futures:
+                future.result()
+            total_ms = (time.perf_counter() - start) * 1000.0
+            writer.close()
+            print(f"    writer {name:5s} submit      {submit_ms:8.1f} ms (all on disk after {total_ms:.1f} ms)")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+OVERLAY BENCHMARK - Heatmap overlay cost per call and per batch
+
+Compares the previous float32 overlay implementation with the LUT +
+uint8 blending path in gradcam_vit: single 224x224 overlays, full
+resolution overlays (heatmap upscaled onto the original image) and a
+batch of video frames through overlay_heatmaps_batch. Also reports the
+largest pixel difference against the previous implementation.
+
+Usage:
+    python benchmarks/benchmark_overlay.py [--iters 200] [--frames 30] [--full-res 1920x1080]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from gradcam_vit import overlay_heatmap_on_image, overlay_heatmaps_batch
+
+
+def legacy_overlay(pil_image, heatmap, alpha=0.5, colormap=cv2.COLORMAP_JET):
+    """The float32 implementation this benchmark compares against."""
+    heatmap = np.clip(np.asarray(heatmap, dtype=np.float32), 0.0, 1.0)
+    h, w = heatmap.shape
+    image_np = np.array(pil_image.resize((w, h)), dtype=np.float32)
+    heatmap_color = cv2.applyColorMap(np.uint8(255 * heatmap), colormap)
+    heatmap_color = cv2.cvtColor(heatmap_color, cv2.COLOR_BGR2RGB).astype(np.float32)
+    overlay = np.clip(alpha * heatmap_color + (1.0 - alpha) * image_np, 0, 255).astype(np.uint8)
+    return Image.fromarray(overlay)
+
+
+def legacy_overlay_full_res(pil_image, heatmap, alpha=0.5, colormap=cv2.COLORMAP_JET):
+    """Previous way to get a full-resolution overlay: upscale the float heatmap first."""
+    heatmap = cv2.resize(np.asarray(heatmap, dtype=np.float32), pil_image.size, interpolation=cv2.INTER_LINEAR)
+    return legacy_overlay(pil_image, heatmap, alpha, colormap)
+
+
+def time_ms(fn, iters, warmup=3):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iters", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--full-res", default="1920x1080")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    full_w, full_h = (int(v) for v in args.full_res.lower().split("x"))
+    full_image = Image.fromarray(rng.integers(0, 256, (full_h, full_w, 3), dtype=np.uint8))
+    image = full_image.resize((224, 224))
+    heatmap = cv2.GaussianBlur(rng.random((224, 224)).astype(np.float32), (31, 31), 0)
+    heatmap = (heatmap - heatmap.min()) / (heatmap.max() - heatmap.min())
+
+    frames = rng.integers(0, 256, (args.frames, 224, 224, 3), dtype=np.uint8)
+    frame_images = [Image.fromarray(f) for f in frames]
+    heatmaps = np.stack([np.roll(heatmap, i, axis=1) for i in range(args.frames)])
+
+    diff = np.abs(
+        np.asarray(legacy_overlay(image, heatmap), dtype=np.int16)
+        - np.asarray(overlay_heatmap_on_image(image, heatmap), dtype=np.int16)
+    ).max()
+
+    rows = [
+        ("224x224 per call",
+         time_ms(lambda: legacy_overlay(image, heatmap), args.iters),
+         time_ms(lambda: overlay_heatmap_on_image(image, heatmap), args.iters)),
+        (f"{full_w}x{full_h} per call",
+         time_ms(lambda: legacy_overlay_full_res(full_image, heatmap), max(5, args.iters // 20)),
+         time_ms(lambda: overlay_heatmap_on_image(full_image, heatmap, full_resolution=True), max(5, args.iters // 20))),
+        (f"{args.frames} frames batch",
+         time_ms(lambda: [legacy_overlay(f, h) for f, h in zip(frame_images, heatmaps)], max(5, args.iters // 10)),
+         time_ms(lambda: overlay_heatmaps_batch(frames, heatmaps), max(5, args.iters // 10))),
+    ]
+
+    print("\n" + "=" * 80)
+    print(f"HEATMAP OVERLAY (max pixel difference vs previous implementation: {diff})")
+    print("=" * 80)
+    print(f"    {'case':24s} {'previous ms':>12s} {'optimized ms':>13s} {'speedup':>8s}")
+    for name, before, after in rows:
+        print(f"    {name:24s} {before:12.3f} {after:13.3f} {before / after:7.1f}x")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+STARTUP BENCHMARK - Time from process start to the first served request
+
+Starts the Flask app in a subprocess for each startup configuration and
+measures, from the moment the process is spawned:
+    - first HTTP response (GET /)
+    - model ready (GET /ready returns 200)
+    - first served prediction (POST /predict), if --token is given
+
+Configurations:
+    default      eager startup (model loaded before the server binds)
+    fast         FAST_START=1 (server binds first, model loads in background)
+    fast+ready   FAST_START=1 READY_MODEL_CACHE=1 (second run uses the cache)
+
+Usage:
+    python benchmarks/benchmark_startup.py [--runs 3] [--token SUPABASE_JWT]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGS = {
+    "default": {"FAST_START": "0", "READY_MODEL_CACHE": "0"},
+    "fast": {"FAST_START": "1", "READY_MODEL_CACHE": "0"},
+    "fast+ready": {"FAST_START": "1", "READY_MODEL_CACHE": "1"},
+}
+
+SERVER_CODE = "import app; app.app.run(host='127.0.0.1', port={port}, threaded=True, use_reloader=False)"
+
+
+def sample_jpeg():
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 480), color=(120, 30, 60)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def wait_for(check, start, timeout):
+    """Poll ``check`` until it returns True; return seconds since ``start``."""
+    while time.perf_counter() - start < timeout:
+        try:
+            if check():
+                return time.perf_counter() - start
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def run_once(env_overrides, port, token, timeout):
+    env = dict(os.environ, **env_overrides)
+    base = f"http://127.0.0.1:{port}"
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", SERVER_CODE.format(port=port)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        first = wait_for(lambda: requests.get(base + "/", timeout=1).status_code < 500, start, timeout)
+        ready = wait_for(lambda: requests.get(base + "/ready", timeout=1).status_code == 200, start, timeout)
+        predict = None
+        if token:
+            image = sample_jpeg()
+            predict = wait_for(
+                lambda: requests.post(
+                    base + "/predict",
+                    files={"file": ("bench.jpg", image, "image/jpeg")},
+                    headers={"Authorization": f"Bearer {token}"},
+                    timeout=timeout,
+                ).status_code == 200,
+                start,
+                timeout,
+            )
+        return {"first_response_s": first, "model_ready_s": ready, "first_predict_s": predict}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    return f"{statistics.median(values):6.2f}s" if values else "   n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--token", default=os.getenv("BENCH_TOKEN"), help="Supabase JWT for POST /predict")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    args = parser.parse_args()
+
+    print("\n" + "=" * 80)
+    print("STARTUP BENCHMARK (median over runs, seconds since process spawn)")
+    print("=" * 80)
+    print(f"    {'config':12s} {'first /':>8s} {'ready':>8s} {'predict':>8s}")
+
+    for name in [c.strip() for c in args.configs.split(",") if c.strip()]:
+        runs = [run_once(CONFIGS[name], args.port, args.token, args.timeout) for _ in range(args.runs)]
+        print(
+            f"    {name:12s} "
+            f"{summarize([r['first_response_s'] for r in runs]):>8s} "
+            f"{summarize([r['model_ready_s'] for r in runs]):>8s} "
+            f"{summarize([r['first_predict_s'] for r in runs]):>8s}"
+        )
+
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+"""
+BENCHMARK SUITE - Inference hot paths with a regression gate
+
+Times every stage of the image and video paths on synthetic inputs:
+
+    decode_jpeg_draft    image_decode.decode_image, 12 MP JPEG (reduced-resolution path)
+    decode_jpeg_full     the same JPEG decoded at full size
+    transform            build_transform on a 1024x768 image
+    forward_single       one (1, 3, 224, 224) forward
+    forward_batch8       one (8, 3, 224, 224) forward
+    gradcam_map          generate_vit_gradcam_map (forward + backward)
+    overlay              overlay_heatmap_on_image, 224x224
+    extract_frames       VideoProcessor.extract_frames, 90-frame 640x480 video
+    process_video        VideoProcessor.process_video end to end (--video-frames frames, heatmaps on)
+
+Without the checkpoint (vit3class.pth) the model uses seeded random
+weights, which cost the same to run. Results (p50 / p95 / mean ms per
+stage plus host metadata) are written to --output as JSON and compared
+with --baseline: a stage whose p50 is more than --threshold slower than
+the baseline fails the run (exit code 1). --update-baseline stores the
+current results as the new baseline instead.
+
+Baselines are per machine, so none is committed: the first run on a host
+(no file at --baseline) records that run as its baseline and passes;
+later runs are compared with it.
+
+Usage:
+    python benchmarks/benchmark_suite.py [--iters 10] [--threshold 0.25]
+    python benchmarks/benchmark_suite.py --update-baseline
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+from gradcam_vit import generate_vit_gradcam_map, overlay_heatmap_on_image
+from heatmap_writer import HeatmapWriter
+from image_decode import decode_image
+from model_loader import CLASS_NAMES, MODEL_PATH, build_transform, load_model, random_model
+from video_processor import VideoProcessor
+
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+
+
+def synthetic_image(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([200 * x / width, 160 * y / height, 120 * (1 - x / width)], axis=-1)
+    base += 40 * np.sin(x / 37.0)[..., None] * np.cos(y / 53.0)[..., None]
+    base += rng.normal(0, 6, base.shape)
+    return Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+
+
+def synthetic_video(path, frames=90, size=(640, 480), fps=30.0):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    base = np.asarray(synthetic_image(*size))[:, :, ::-1]
+    for i in range(frames):
+        writer.write(np.roll(base, 4 * i, axis=1))
+    writer.release()
+
+
+def time_stage(fn, iters, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+        "mean_ms": statistics.mean(timings),
+        "min_ms": timings[0],
+        "iters": iters,
+    }
+
+
+def run_suite(args, workdir):
+    if os.path.exists(args.model):
+        model = load_model(args.model, "cpu")
+        weights = "checkpoint"
+    else:
+        print(f"[BENCH] {args.model} not found, using randomly initialised weights")
+        model = random_model("cpu")
+        weights = "random"
+
+    transform = build_transform()
+    buf = io.BytesIO()
+    synthetic_image(4000, 3000).save(buf, format="JPEG", quality=90)
+    jpeg = buf.getvalue()
+    image = synthetic_image(1024, 768)
+    x1 = torch.randn(1, 3, 224, 224)
+    x8 = torch.randn(8, 3, 224, 224)
+    small = image.resize((224, 224))
+    heatmap = cv2.GaussianBlur(np.random.default_rng(0).random((224, 224)).astype(np.float32), (31, 31), 0)
+    heatmap = (heatmap - heatmap.min()) / (heatmap.max() - heatmap.min())
+
+    video_path = os.path.join(workdir, "bench.avi")
+    synthetic_video(video_path)
+    writer = HeatmapWriter("jpeg", workers=2)
+    processor = VideoProcessor(model, "cpu", CLASS_NAMES, transform, heatmap_writer=writer)
+
+    def forward(x):
+        with torch.no_grad():
+            return model(x)
+
+    light, heavy = max(1, args.iters), max(2, args.iters // 5)
+    stages = [
+        ("decode_jpeg_draft", lambda: decode_image(jpeg), light),
+        ("decode_jpeg_full", lambda: decode_image(jpeg, draft=False), heavy),
+        ("transform", lambda: transform(image), light),
+        ("forward_single", lambda: forward(x1), light),
+        ("forward_batch8", lambda: forward(x8), heavy),
+        ("gradcam_map", lambda: generate_vit_gradcam_map(model, "cpu", small, transform, 0), heavy),
+        ("overlay", lambda: overlay_heatmap_on_image(small, heatmap), light * 10),
+        ("extract_frames", lambda: processor.extract_frames(video_path, max_frames=30), heavy),
+        ("process_video", lambda: processor.process_video(video_path, max_frames=args.video_frames), 2),
+    ]
+
+    results = {}
+    for name, fn, iters in stages:
+        if args.stages and name not in args.stages:
+            continue
+        results[name] = time_stage(fn, iters)
+        r = results[name]
+        print(f"[BENCH] {name:18s} p50 {r['p50_ms']:9.2f} ms  p95 {r['p95_ms']:9.2f} ms  ({iters} iters)")
+    writer.close()
+
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "threads": torch.get_num_threads(),
+        "weights": weights,
+        "video_frames": args.video_frames,
+    }
+    return {"meta": meta, "stages": results}
+
+
+def compare(current, baseline, threshold):
+    """Print the comparison table; return the names of regressed stages."""
+
+    for key in ("cpu_count", "threads", "torch"):
+        if current["meta"].get(key) != baseline["meta"].get(key):
+            print(f"[BENCH] Warning: baseline {key} is {baseline['meta'].get(key)}, "
+                  f"this run {current['meta'].get(key)}; timings may not be comparable")
+
+    regressions = []
+    print("\n" + "=" * 80)
+    print(f"BENCHMARK vs BASELINE (p50, fail above +{threshold * 100:.0f}%)")
+    print("=" * 80)
+    print(f"    {'stage':18s} {'baseline ms':>12s} {'current ms':>12s} {'change':>9s}  status")
+    for name, result in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            print(f"    {name:18s} {'-':>12s} {result['p50_ms']:12.2f} {'':>9s}  new")
+            continue
+        change = result["p50_ms"] / base["p50_ms"] - 1.0
+        status = "REGRESSION" if change > threshold else ("faster" if change < -threshold else "ok")
+        if status == "REGRESSION":
+            regressions.append(name)
+        print(f"    {name:18s} {base['p50_ms']:12.2f} {result['p50_ms']:12.2f} {change * 100:+8.1f}%  {status}")
+    print("=" * 80 + "\n")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join(REPO_ROOT, MODEL_PATH))
+    parser.add_argument("--iters", type=int, default=10, help="iterations for light stages (heavy stages use iters // 5)")
+    parser.add_argument("--video-frames", type=int, default=4, help="frames analyzed by process_video")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    parser.add_argument("--stages", nargs="+", default=None, help="only run these stages")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    # process_video writes heatmaps under ./uploads; keep them out of the repo
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            results = run_suite(args, workdir)
+        finally:
+            os.chdir(cwd)
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"[BENCH] Results written to {output}")
+
+    if args.update_baseline or not os.path.exists(baseline_path):
+        first_run = not args.update_baseline
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        if first_run:
+            print(f"[BENCH] No baseline for this machine yet; recorded this run as {baseline_path}")
+        else:
+            print(f"[BENCH] Baseline updated: {baseline_path}")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"[BENCH] FAILED: {len(regressions)} stage(s) regressed: {', '.join(regressions)}")
+        return 1
+    print("[BENCH] PASSED")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
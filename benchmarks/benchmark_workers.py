@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+PRE-FORK THROUGHPUT BENCHMARK - Throughput vs number of workers
+
+For each worker count, starts serve_prefork.py, waits for /ready, drives
+POST /predict from concurrent clients for a fixed duration and reports
+requests/s and latency percentiles, followed by the per-process memory
+report showing that the model weights are shared rather than duplicated.
+
+Token verification is pointed at a local stand-in for Supabase that
+accepts any token, so no real credentials are needed. Sightengine is
+disabled for the run.
+
+Usage:
+    python benchmarks/benchmark_workers.py [--workers 1,2,4] [--clients 8] [--duration 20]
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from serve_prefork import print_memory_report
+
+
+class _AcceptAllAuth(BaseHTTPRequestHandler):
+    """Minimal Supabase /auth/v1/user stand-in."""
+
+    def do_GET(self):  # noqa: N802
+        body = json.dumps({"id": "bench-user", "email": "bench@example.com"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def sample_jpeg():
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 480), color=(120, 30, 60)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def drive(base, clients, duration, image):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(i):
+        nonlocal errors
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                resp = session.post(
+                    base + "/predict",
+                    files={"file": (f"bench_{i}.jpg", image, "image/jpeg")},
+                    headers={"Authorization": "Bearer bench"},
+                    timeout=120,
+                )
+                ok = resp.status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000.0
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+
+    return latencies, errors
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--share-memory", action="store_true")
+    args = parser.parse_args()
+
+    auth = ThreadingHTTPServer(("127.0.0.1", 0), _AcceptAllAuth)
+    threading.Thread(target=auth.serve_forever, daemon=True).start()
+
+    env = dict(
+        os.environ,
+        SUPABASE_URL=f"http://127.0.0.1:{auth.server_address[1]}",
+        SIGHTENGINE_API_USER="YOUR_API_USER",
+        SIGHTENGINE_API_USER_1="",
+        SIGHTENGINE_API_USER_2="",
+    )
+    image = sample_jpeg()
+    base = f"http://127.0.0.1:{args.port}"
+
+    print("\n" + "=" * 80)
+    print(f"PRE-FORK THROUGHPUT ({args.clients} clients, {args.duration:.0f}s per run, {os.cpu_count()} CPUs)")
+    print("=" * 80)
+
+    rows = []
+    for n in [int(w) for w in args.workers.split(",") if w.strip()]:
+        cmd = [sys.executable, os.path.join(ROOT, "serve_prefork.py"), "--workers", str(n), "--port", str(args.port)]
+        if args.share_memory:
+            cmd.append("--share-memory")
+        proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.time() + 300
+            while time.time() < deadline:
+                try:
+                    if requests.get(base + "/ready", timeout=1).status_code == 200:
+                        break
+                except requests.exceptions.RequestException:
+                    pass
+                time.sleep(0.2)
+
+            drive(base, args.clients, min(3.0, args.duration), image)  # warm-up
+            latencies, errors = drive(base, args.clients, args.duration, image)
+            rps = len(latencies) / args.duration
+            rows.append((n, rps, percentile(latencies, 50), percentile(latencies, 95), errors))
+            print(f"\n[{n} worker(s)] {rps:.2f} req/s, p50 {percentile(latencies, 50):.0f} ms, "
+                  f"p95 {percentile(latencies, 95):.0f} ms, errors {errors}")
+            print_memory_report(proc.pid)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    print("\n" + "=" * 80)
+    print(f"    {'workers':>7s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'errors':>7s}")
+    for n, rps, p50, p95, errors in rows:
+        print(f"    {n:7d} {rps:8.2f} {p50:8.0f} {p95:8.0f} {errors:7d}")
+    print("=" * 80 + "\n")
+    auth.shutdown()
+
+
+if __name__ == "__main__":
+    main()
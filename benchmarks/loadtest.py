@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+"""
+LOAD TEST - End-to-end load on /predict, /reverse_search and /predict_video
+
+Starts benchmarks/mock_providers.py (Supabase, Sightengine, tmpfiles,
+SerpAPI and RapidAPI stand-ins with configurable latency and error rates),
+launches the app under serve_prefork.py with its external endpoints and
+credentials pointed at the mocks, and drives each endpoint with a closed
+loop of N concurrent clients (each its own user token) for --duration
+seconds at every --concurrency level.
+
+Per endpoint and level it reports throughput, p50 / p95 / p99 latency of
+successful requests, the error rate (transport errors, HTTP errors, or an
+"error" field in a 200 body) and the share of requests rejected by
+admission control (503), plus the upstream calls the mocks received.
+
+With --target the app already running at that URL is tested instead; start
+it against the mocks yourself (python benchmarks/mock_providers.py prints
+the environment to export).
+
+Usage:
+    python benchmarks/loadtest.py [--concurrency 1 2 4 8] [--duration 20]
+    python benchmarks/loadtest.py --endpoints predict --latency sightengine=2 --error-rate all=0.05
+    python benchmarks/loadtest.py --app-env INFERENCE_POOL_WORKERS=2 PREDICT_MAX_CONCURRENT=8 --json load.json
+"""
+
+import argparse
+import io
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import cv2
+import numpy as np
+import requests
+from PIL import Image
+
+import mock_providers
+
+
+ENDPOINTS = ("predict", "reverse_search", "predict_video")
+
+
+def synthetic_jpeg(width=512, height=384):
+    # Small enough that SerpAPI's base64 GET stays under the mock's request-line limit
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([200 * x / width, 160 * y / height, 120 * (1 - x / width)], axis=-1)
+    base += 40 * np.sin(x / 37.0)[..., None] * np.cos(y / 53.0)[..., None]
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(base, 0, 255).astype(np.uint8)).save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def synthetic_video(frames=30, size=(320, 240)):
+    with tempfile.NamedTemporaryFile(suffix=".avi") as f:
+        writer = cv2.VideoWriter(f.name, cv2.VideoWriter_fourcc(*"MJPG"), 15.0, size)
+        base = np.asarray(Image.open(io.BytesIO(synthetic_jpeg(*size))))[:, :, ::-1]
+        for i in range(frames):
+            writer.write(np.roll(base, 4 * i, axis=1))
+        writer.release()
+        return f.read()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(args, env_overrides, log_path):
+    """Launch serve_prefork.py on a free port; return (process, base URL) once /ready is 200."""
+
+    port = free_port()
+    env = dict(os.environ, **env_overrides)
+    log = open(log_path, "w")
+    proc = subprocess.Popen(
+        [sys.executable, "serve_prefork.py", "--port", str(port), "--workers", str(args.app_workers)],
+        cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"[LOAD] App exited with code {proc.returncode}; see {log_path}")
+        try:
+            if requests.get(f"{url}/ready", timeout=2).status_code == 200:
+                return proc, url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit(f"[LOAD] App not ready after {args.startup_timeout} s; see {log_path}")
+
+
+def stop_app(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def send(session, url, endpoint, payload, token, timeout):
+    """One request; return (latency ms, outcome) with outcome ok, error or rejected."""
+
+    start = time.perf_counter()
+    try:
+        resp = session.post(f"{url}/{endpoint}", files={"file": payload},
+                            headers={"Authorization": f"Bearer {token}"}, timeout=timeout)
+        latency = (time.perf_counter() - start) * 1000.0
+    except requests.exceptions.RequestException:
+        return (time.perf_counter() - start) * 1000.0, "error"
+    if resp.status_code == 503:
+        return latency, "rejected"
+    if resp.status_code != 200:
+        return latency, "error"
+    try:
+        body = resp.json()
+    except ValueError:
+        return latency, "error"
+    # /reverse_search reports failures as 200 with an "error" field
+    return latency, "error" if isinstance(body, dict) and body.get("error") else "ok"
+
+
+def run_level(url, endpoint, payload, concurrency, duration, timeout):
+    """Closed loop: ``concurrency`` clients send back-to-back requests for ``duration`` seconds."""
+
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        session = requests.Session()
+        token = f"loadtest-user-{index}"
+        local = []
+        while time.perf_counter() < deadline:
+            local.append(send(session, url, endpoint, payload, token, timeout))
+        session.close()
+        with lock:
+            samples.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ok = sorted(latency for latency, outcome in samples if outcome == "ok")
+    total = len(samples)
+    errors = sum(1 for _, outcome in samples if outcome == "error")
+    rejected = sum(1 for _, outcome in samples if outcome == "rejected")
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ok, 0.50),
+        "p95_ms": percentile(ok, 0.95),
+        "p99_ms": percentile(ok, 0.99),
+        "mean_ms": statistics.mean(ok) if ok else None,
+        "error_rate": errors / total if total else 0.0,
+        "rejected_rate": rejected / total if total else 0.0,
+    }
+
+
+def upstream_delta(before, after):
+    return {name: {k: after[name][k] - before[name][k] for k in ("calls", "errors")}
+            for name in after if after[name]["calls"] != before[name]["calls"]}
+
+
+def fmt_ms(value):
+    return f"{value:9.0f}" if value is not None else f"{'-':>9s}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per endpoint and level")
+    parser.add_argument("--timeout", type=float, default=180.0, help="client timeout per request (s)")
+    parser.add_argument("--target", default=None, help="test an app already running at this URL")
+    parser.add_argument("--app-workers", type=int, default=2, help="serve_prefork.py worker processes")
+    parser.add_argument("--app-env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the launched app")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--json", default=None, help="write all results to this file")
+    mock_providers.add_arguments(parser)
+    args = parser.parse_args()
+
+    mock = None
+    proc = None
+    log_path = os.path.join(tempfile.gettempdir(), f"loadtest_app_{os.getpid()}.log")
+    if args.target:
+        url = args.target.rstrip("/")
+    else:
+        mock = mock_providers.from_args(args).start()
+        env = mock.app_env()
+        env.update(item.split("=", 1) for item in args.app_env)
+        print(f"[LOAD] Provider mocks on {mock.base_url}; starting the app ({args.app_workers} worker(s), log {log_path})")
+        proc, url = start_app(args, env, log_path)
+        print(f"[LOAD] App ready on {url}")
+
+    payloads = {
+        "predict": ("loadtest.jpg", synthetic_jpeg(), "image/jpeg"),
+        "reverse_search": ("loadtest.jpg", synthetic_jpeg(), "image/jpeg"),
+        "predict_video": ("loadtest.avi", synthetic_video(), "video/x-msvideo"),
+    }
+
+    results = {}
+    try:
+        for endpoint in args.endpoints:
+            # Warm-up request (first-touch costs, connection setup)
+            with requests.Session() as session:
+                send(session, url, endpoint, payloads[endpoint], "loadtest-warmup", args.timeout)
+            results[endpoint] = []
+            for concurrency in args.concurrency:
+                before = mock.snapshot() if mock else None
+                level = run_level(url, endpoint, payloads[endpoint], concurrency, args.duration, args.timeout)
+                if mock:
+                    level["upstream"] = upstream_delta(before, mock.snapshot())
+                results[endpoint].append(level)
+                print(f"[LOAD] /{endpoint} x{concurrency}: {level['requests']} requests, "
+                      f"{level['throughput_rps']:.2f} req/s, errors {level['error_rate'] * 100:.1f}%")
+    finally:
+        if proc:
+            stop_app(proc)
+        if mock:
+            mock.stop()
+
+    print("\n" + "=" * 80)
+    print(f"LOAD TEST ({args.duration:.0f} s per level; latency of successful requests)")
+    print("=" * 80)
+    for endpoint, levels in results.items():
+        print(f"/{endpoint}")
+        print(f"    {'clients':>7s} {'requests':>8s} {'req/s':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} "
+              f"{'errors':>7s} {'503':>6s}")
+        for r in levels:
+            print(f"    {r['concurrency']:7d} {r['requests']:8d} {r['throughput_rps']:7.2f} {fmt_ms(r['p50_ms'])} "
+                  f"{fmt_ms(r['p95_ms'])} {fmt_ms(r['p99_ms'])} {r['error_rate'] * 100:6.1f}% "
+                  f"{r['rejected_rate'] * 100:5.1f}%")
+        if mock:
+            calls = {}
+            for r in levels:
+                for name, counts in r["upstream"].items():
+                    total = calls.setdefault(name, {"calls": 0, "errors": 0})
+                    total["calls"] += counts["calls"]
+                    total["errors"] += counts["errors"]
+            print("    upstream: " + ", ".join(f"{name} {c['calls']} ({c['errors']} failed)" for name, c in calls.items()))
+    print("=" * 80 + "\n")
+
+    if args.json:
+        meta = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "target": args.target,
+            "app_workers": None if args.target else args.app_workers,
+            "app_env": args.app_env,
+            "duration_s": args.duration,
+            "mock_latency": mock.latency if mock else None,
+            "mock_error_rate": mock.error_rate if mock else None,
+        }
+        with open(args.json, "w") as f:
+            json.dump({"meta": meta, "endpoints": results}, f, indent=2)
+        print(f"[LOAD] Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
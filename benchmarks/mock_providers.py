@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+"""
+MOCK PROVIDERS - Local stand-ins for the app's external services
+
+One threaded HTTP server answers for every provider the app calls, each
+under its own path prefix and with the response shape the app parses:
+
+    supabase           GET  /supabase/auth/v1/user                  (token verification)
+    sightengine        POST /sightengine/check.json                 (image genai scores)
+    sightengine_video  POST /sightengine/video/check-sync.json      (per-frame genai scores)
+    tmpfiles           POST /tmpfiles/api/v1/upload                 (public URL for the upload)
+    serpapi            GET  /serpapi/search                         (visual matches)
+    rapidapi           GET  /rapidapi/reverse-image-search          (reverse search results)
+
+Every provider sleeps for its configured latency (+/- --jitter) and fails
+a configured fraction of calls with --error-status. GET /_stats returns
+the call and error counts per provider.
+
+Run standalone and export the printed variables before starting the app
+(benchmarks/loadtest.py does both for you):
+
+    python benchmarks/mock_providers.py --port 8900 --latency sightengine=0.5 --error-rate serpapi=0.2
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+# Typical latencies (seconds) of the real services
+DEFAULT_LATENCY = {
+    "supabase": 0.05,
+    "sightengine": 0.8,
+    "sightengine_video": 3.0,
+    "tmpfiles": 0.3,
+    "serpapi": 2.0,
+    "rapidapi": 1.5,
+}
+
+ROUTES = {
+    ("GET", "/supabase/auth/v1/user"): "supabase",
+    ("POST", "/sightengine/check.json"): "sightengine",
+    ("POST", "/sightengine/video/check-sync.json"): "sightengine_video",
+    ("POST", "/tmpfiles/api/v1/upload"): "tmpfiles",
+    ("GET", "/serpapi/search"): "serpapi",
+    ("GET", "/rapidapi/reverse-image-search"): "rapidapi",
+}
+
+
+def parse_overrides(items, known=DEFAULT_LATENCY):
+    """Turn ``["name=value", ...]`` into a dict of floats ("all=value" sets every provider)."""
+
+    values = {}
+    for item in items or ():
+        name, _, value = item.partition("=")
+        if name == "all":
+            values.update({provider: float(value) for provider in known})
+        elif name in known:
+            values[name] = float(value)
+        else:
+            raise ValueError(f"Unknown provider {name!r} (choose from {', '.join(known)} or all)")
+    return values
+
+
+class MockProviders:
+    """The mock server; ``start()`` serves it from a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=None, error_rate=None, jitter=0.2,
+                 error_status=500, seed=0):
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.error_rate = dict.fromkeys(DEFAULT_LATENCY, 0.0)
+        self.error_rate.update(error_rate or {})
+        self.jitter = jitter
+        self.error_status = error_status
+        self.stats = {name: {"calls": 0, "errors": 0} for name in DEFAULT_LATENCY}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._uploads = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def app_env(self):
+        """Environment variables that point the app at this server."""
+
+        base = self.base_url
+        return {
+            "SUPABASE_URL": f"{base}/supabase",
+            "SIGHTENGINE_API_URL": f"{base}/sightengine",
+            "SIGHTENGINE_API_USER": "loadtest",
+            "SIGHTENGINE_API_SECRET": "loadtest",
+            "TMPFILES_UPLOAD_URL": f"{base}/tmpfiles/api/v1/upload",
+            "SERPAPI_API_KEY": "loadtest",
+            "SERPAPI_URL": f"{base}/serpapi/search",
+            "RAPIDAPI_KEY": "loadtest",
+            "RAPIDAPI_URL": f"{base}/rapidapi/reverse-image-search",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-providers", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(counts) for name, counts in self.stats.items()}
+
+    def _draw(self, provider):
+        """Record a call; return (delay seconds, failed?, random score, upload number)."""
+
+        with self._lock:
+            self.stats[provider]["calls"] += 1
+            delay = self.latency[provider] * self._random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+            failed = self._random.random() < self.error_rate[provider]
+            if failed:
+                self.stats[provider]["errors"] += 1
+            score = self._random.random()
+            self._uploads += provider == "tmpfiles"
+            upload_id = self._uploads
+        return max(0.0, delay), failed, score, upload_id
+
+    def _respond(self, provider, headers, upload_id, score):
+        if provider == "supabase":
+            token = (headers.get("Authorization") or "").replace("Bearer ", "")
+            if not token:
+                return 401, {"msg": "missing token"}
+            user_id = hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+            return 200, {"id": user_id, "email": f"{user_id[:8]}@loadtest.local", "role": "authenticated"}
+        if provider == "sightengine":
+            return 200, {"status": "success", "type": {"ai_generated": round(score, 4)}}
+        if provider == "sightengine_video":
+            frames = [{"info": {"position": i}, "type": {"ai_generated": round((score + i / 10.0) % 1.0, 4)}}
+                      for i in range(10)]
+            return 200, {"status": "success", "data": {"frames": frames}}
+        if provider == "tmpfiles":
+            return 200, {"status": "success", "data": {"url": f"{self.base_url}/tmpfiles/{upload_id}/upload.jpg"}}
+        matches = [{"title": f"Match {i}", "link": f"https://example.com/{provider}/{upload_id}/{i}"} for i in range(5)]
+        if provider == "serpapi":
+            return 200, {"search_metadata": {"status": "Success"}, "visual_matches": matches}
+        return 200, {"data": [{"title": m["title"], "url": m["link"]} for m in matches]}
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self, method):
+                parts = urlsplit(self.path)
+                # Drain the upload so keep-alive connections stay in sync
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+
+                if parts.path == "/_stats":
+                    return self._send(200, mock.snapshot())
+                provider = ROUTES.get((method, parts.path))
+                if provider is None:
+                    return self._send(404, {"error": f"no mock for {method} {parts.path}"})
+
+                delay, failed, score, upload_id = mock._draw(provider)
+                time.sleep(delay)
+                if failed:
+                    return self._send(mock.error_status, {"error": f"injected {provider} failure"})
+                status, body = mock._respond(provider, self.headers, upload_id, score)
+                self._send(status, body)
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def add_arguments(parser):
+    """Mock configuration flags shared with benchmarks/loadtest.py."""
+
+    parser.add_argument("--latency", nargs="*", default=[], metavar="NAME=SECONDS",
+                        help=f"per-provider latency (defaults: "
+                             f"{', '.join(f'{k}={v}' for k, v in DEFAULT_LATENCY.items())})")
+    parser.add_argument("--error-rate", nargs="*", default=[], metavar="NAME=FRACTION",
+                        help="per-provider fraction of failed calls (default 0); NAME may be 'all'")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative latency jitter (0.2 = +/-20%%)")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+
+
+def from_args(args, host="127.0.0.1", port=0):
+    return MockProviders(host, port, latency=parse_overrides(args.latency),
+                         error_rate=parse_overrides(args.error_rate), jitter=args.jitter,
+                         error_status=args.error_status)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    mock = from_args(args, args.host, args.port)
+    print(f"[MOCK] Serving provider mocks on {mock.base_url}; point the app at them with:")
+    for key, value in mock.app_env().items():
+        print(f"    export {key}={value}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"[MOCK] Calls: {json.dumps(mock.snapshot())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+"""
+Offline bulk scoring with the serving model and preprocessing.
+
+Scores every image in a directory (recursively) or listed in a manifest
+(.txt with one path per line, .csv with a ``path`` column, or .jsonl with
+a ``path`` field) using exactly the app's model, backend and transform:
+images are decoded by a multi-process DataLoader (image_decode, with the
+reduced-resolution JPEG path), scored in batches, and results are
+streamed to JSON Lines or Parquet (one part file per checkpoint; needs
+``pyarrow``).
+
+Progress is checkpointed next to the output every ``--checkpoint-every``
+images. Re-running the same command resumes after the last checkpoint
+(the JSONL output is truncated back to it, uncommitted Parquet parts are
+discarded), so every input is written exactly once. ``--restart`` starts
+over.
+
+Usage:
+    python bulk_score.py photos/ -o scores.jsonl
+    python bulk_score.py manifest.csv -o scores/ --format parquet --workers 8 --batch-size 64
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from image_decode import decode_image
+from inference_backends import create_backend
+from model_loader import CLASS_NAMES, MODEL_PATH, build_transform, checkpoint_fingerprint, load_model
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".avif", ".webp")
+
+
+def list_inputs(source):
+    """Sorted image paths under a directory, or the paths listed in a manifest."""
+
+    if os.path.isdir(source):
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames.sort()
+            paths.extend(os.path.join(dirpath, n) for n in sorted(filenames) if n.lower().endswith(IMAGE_EXTENSIONS))
+        return paths
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline="") as f:
+        if source.lower().endswith(".jsonl"):
+            paths = [json.loads(line)["path"] for line in f if line.strip()]
+        elif source.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            column = "path" if "path" in (reader.fieldnames or []) else reader.fieldnames[0]
+            paths = [row[column] for row in reader if row.get(column)]
+        else:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in paths]
+
+
+class ImageDataset(Dataset):
+    """Reads, hashes and preprocesses one image per item (runs in loader workers).
+
+    Unreadable images yield a zero tensor and an error string instead of
+    raising, so one bad file never stops the run.
+    """
+
+    def __init__(self, paths, transform, draft=True):
+        self.paths = paths
+        self.transform = transform
+        self.draft = draft
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, index):
+        sha = ""
+        try:
+            with open(self.paths[index], "rb") as f:
+                data = f.read()
+            sha = hashlib.sha256(data).hexdigest()
+            return self.transform(decode_image(data, draft=self.draft)), sha, ""
+        except Exception as e:
+            return torch.zeros(3, 224, 224), sha, f"{type(e).__name__}: {e}"
+
+
+class JsonlOutput:
+    """Appends one JSON object per line; ``commit`` makes the rows durable."""
+
+    def __init__(self, path, state=None):
+        self.path = path
+        self._file = open(path, "ab")
+        if state:
+            # Drop rows written after the last checkpoint
+            self._file.truncate(state["output_bytes"])
+            self._file.seek(state["output_bytes"])
+
+    def write(self, rows):
+        self._file.write("".join(json.dumps(row) + "\n" for row in rows).encode("utf-8"))
+
+    def commit(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"output_bytes": self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    """Writes each checkpoint's rows as one ``part-NNNNN.parquet`` file in a directory."""
+
+    def __init__(self, path, state=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise SystemExit("[SCORE] --format parquet requires pyarrow (pip install pyarrow)") from e
+        self._pa, self._pq = pa, pq
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.parts = state["parts"] if state else 0
+        # Parts (or temp files) beyond the checkpoint are from an interrupted run
+        for name in os.listdir(path):
+            if name.startswith("part-") and (name.endswith(".tmp") or int(name[5:10]) >= self.parts):
+                os.remove(os.path.join(path, name))
+        self._rows = []
+
+    def write(self, rows):
+        self._rows.extend(rows)
+
+    def commit(self):
+        if self._rows:
+            final = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+            self._pq.write_table(self._pa.Table.from_pylist(self._rows), final + ".tmp")
+            os.replace(final + ".tmp", final)
+            self.parts += 1
+            self._rows = []
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+
+def checkpoint_path(output, fmt):
+    return os.path.join(output, "_progress.json") if fmt == "parquet" else output + ".progress.json"
+
+
+def save_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def result_rows(paths, probs, shas, errors):
+    rows = []
+    prob_iter = iter(probs.tolist())
+    for path, sha, error in zip(paths, shas, errors):
+        if error:
+            rows.append({"path": path, "sha256": sha or None, "prediction": None, "confidence": None,
+                         "scores": None, "error": error})
+            continue
+        p = next(prob_iter)
+        best = max(range(len(p)), key=p.__getitem__)
+        rows.append({
+            "path": path,
+            "sha256": sha,
+            "prediction": CLASS_NAMES[best],
+            "confidence": round(p[best], 6),
+            "scores": {CLASS_NAMES[i]: round(v, 6) for i, v in enumerate(p)},
+            "error": None,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="image directory or manifest (.txt, .csv, .jsonl)")
+    parser.add_argument("-o", "--output", required=True, help="output .jsonl file or Parquet directory")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default=None,
+                        help="default: parquet if --output ends in .parquet or is a directory, else jsonl")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--backend", default=os.getenv("INFERENCE_BACKEND", "eager"),
+                        help="inference backend (eager, int8, torchscript, compile, onnx, auto)")
+    parser.add_argument("--cache-dir", default=os.getenv("MODEL_CACHE_DIR", "model_cache"))
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="decoding processes (0 = decode in the main process)")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    parser.add_argument("--full-decode", action="store_true", help="disable the reduced-resolution JPEG decode")
+    parser.add_argument("--checkpoint-every", type=int, default=1024, help="images between checkpoints")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and overwrite the output")
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") or os.path.isdir(args.output) else "jsonl")
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    paths = list_inputs(args.source)
+    inputs_sha = hashlib.sha256("\n".join(paths).encode("utf-8")).hexdigest()
+    model_sha = checkpoint_fingerprint(args.model)[:16]
+    progress_file = checkpoint_path(args.output, fmt)
+
+    state = None
+    if args.restart:
+        if os.path.exists(progress_file):
+            os.remove(progress_file)
+        if fmt == "jsonl" and os.path.exists(args.output):
+            os.remove(args.output)
+        elif fmt == "parquet":
+            for part in glob.glob(os.path.join(args.output, "part-*")):
+                os.remove(part)
+    elif os.path.exists(progress_file):
+        with open(progress_file) as f:
+            state = json.load(f)
+        if state["inputs_sha"] != inputs_sha or state["model"] != model_sha:
+            print("[SCORE] Inputs or model changed since the checkpoint; use --restart to start over")
+            return 1
+        print(f"[SCORE] Resuming after {state['done']}/{len(paths)} images")
+    elif fmt == "jsonl" and os.path.exists(args.output) and os.path.getsize(args.output):
+        print(f"[SCORE] {args.output} exists without a checkpoint; use --restart to overwrite it")
+        return 1
+
+    done = state["done"] if state else 0
+    errors = state["errors"] if state else 0
+    output = (ParquetOutput if fmt == "parquet" else JsonlOutput)(args.output, state)
+
+    model = load_model(args.model, args.device)
+    backend = create_backend(args.backend, model, args.device, args.model, cache_dir=args.cache_dir)
+    print(f"[SCORE] {len(paths) - done} image(s) to score with the {backend.name} backend on {args.device}, "
+          f"{args.workers} loader process(es), batch {args.batch_size} -> {args.output} ({fmt})")
+
+    remaining = paths[done:]
+    dataset = ImageDataset(remaining, build_transform(), draft=not args.full_decode)
+    loader_kwargs = {"prefetch_factor": 4} if args.workers > 0 else {}
+    loader = DataLoader(dataset, batch_size=args.batch_size, num_workers=args.workers, **loader_kwargs)
+
+    start = last_report = time.perf_counter()
+    wait_s = infer_s = 0.0
+    scored = 0
+    last_commit = done
+    batch_start = time.perf_counter()
+    for tensors, shas, batch_errors in loader:
+        now = time.perf_counter()
+        wait_s += now - batch_start
+
+        ok = [i for i, e in enumerate(batch_errors) if not e]
+        probs = backend.predict_proba(tensors[ok]) if ok else torch.empty(0, len(CLASS_NAMES))
+        infer_s += time.perf_counter() - now
+
+        batch_paths = remaining[scored:scored + len(batch_errors)]
+        output.write(result_rows(batch_paths, probs, shas, batch_errors))
+        scored += len(batch_errors)
+        errors += len(batch_errors) - len(ok)
+
+        if done + scored - last_commit >= args.checkpoint_every:
+            last_commit = done + scored
+            save_checkpoint(progress_file, {"inputs_sha": inputs_sha, "model": model_sha, "done": last_commit,
+                                            "errors": errors, **output.commit()})
+
+        if time.perf_counter() - last_report >= args.report_every:
+            last_report = time.perf_counter()
+            rate = scored / (last_report - start)
+            eta = (len(remaining) - scored) / rate if rate else 0.0
+            print(f"[SCORE] {done + scored}/{len(paths)} images, {rate:.1f} img/s, ETA {eta / 60:.1f} min")
+        batch_start = time.perf_counter()
+
+    save_checkpoint(progress_file, {"inputs_sha": inputs_sha, "model": model_sha, "done": done + scored,
+                                    "errors": errors, **output.commit()})
+    output.close()
+
+    elapsed = time.perf_counter() - start
+    print("\n" + "=" * 80)
+    print("BULK SCORING SUMMARY")
+    print("=" * 80)
+    print(f"    scored this run:     {scored} ({done + scored}/{len(paths)} total, {errors} error(s))")
+    print(f"    wall time:           {elapsed:.1f} s")
+    print(f"    throughput:          {scored / elapsed if elapsed else 0.0:.1f} img/s")
+    print(f"    inference:           {1000.0 * infer_s / max(1, scored):.1f} ms/img")
+    print(f"    waiting for loader:  {100.0 * wait_s / elapsed if elapsed else 0.0:.0f}% of wall time")
+    print("=" * 80 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Load-shedding policy for the optional stages of ``/predict``.
+
+The verdict itself (decode + ViT forward) is never shed. Everything else
+is "nice to have" and is dropped progressively while the service is over
+budget:
+
+    level 0  everything runs
+    level 1  skip the heatmap: /predict issues no heatmap token and
+             /heatmap/<token> answers 503 instead of running Grad-CAM
+    level 2  additionally skip the external Sightengine ensemble call
+
+Pressure is the larger of ``queue_depth / queue_budget`` and
+``recent mean latency / latency_budget``, where recent latency only
+covers the last ``window_s`` seconds, so pressure decays by itself once
+load drops. Each level is entered at its threshold and only left once
+pressure falls below ``recovery_ratio`` times that threshold, which keeps
+the policy from flapping when shedding itself brings latency down.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Sequence, Tuple
+
+
+# Stages shed at each level, cumulative
+SHED_LEVELS: Sequence[Tuple[str, ...]] = (
+    (),
+    ("heatmap",),
+    ("heatmap", "ensemble"),
+)
+
+
+class DegradationPolicy:
+    """Chooses which optional stages to skip from queue depth and latency."""
+
+    def __init__(
+        self,
+        latency_budget_s: float = 5.0,
+        queue_budget: int = 8,
+        thresholds: Sequence[float] = (1.0, 1.5),
+        recovery_ratio: float = 0.7,
+        window_s: float = 30.0,
+        enabled: bool = True,
+    ):
+        self.latency_budget_s = latency_budget_s
+        self.queue_budget = max(1, queue_budget)
+        self.thresholds = tuple(thresholds)
+        self.recovery_ratio = recovery_ratio
+        self.window_s = window_s
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._latencies: Deque[Tuple[float, float]] = deque()
+        self._level = 0
+        self._shed_counts = {stage: 0 for level in SHED_LEVELS for stage in level}
+
+    def observe(self, latency_s: float) -> None:
+        """Record the latency of a completed request."""
+
+        now = time.monotonic()
+        with self._lock:
+            self._latencies.append((now, latency_s))
+            self._expire_locked(now)
+
+    def shed_stages(self, queue_depth: int = 0) -> List[str]:
+        """Update the level for the current load and return stages to skip."""
+
+        if not self.enabled:
+            return []
+
+        with self._lock:
+            pressure = self._pressure_locked(queue_depth)
+
+            # Escalate to the highest level whose threshold is crossed
+            level = self._level
+            for i, threshold in enumerate(self.thresholds, start=1):
+                if pressure >= threshold:
+                    level = max(level, i)
+
+            # Recover one level at a time with hysteresis
+            while level > 0 and pressure < self.thresholds[level - 1] * self.recovery_ratio:
+                level -= 1
+
+            if level != self._level:
+                print(f"[DEGRADE] Level {self._level} -> {level} (pressure {pressure:.2f})")
+                self._level = level
+
+            stages = list(SHED_LEVELS[level])
+            for stage in stages:
+                self._shed_counts[stage] += 1
+            return stages
+
+    def stats(self, queue_depth: int = 0) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "level": self._level,
+                "shed_stages": list(SHED_LEVELS[self._level]),
+                "pressure": round(self._pressure_locked(queue_depth), 3),
+                "recent_mean_latency_s": round(self._mean_latency_locked(), 3),
+                "latency_budget_s": self.latency_budget_s,
+                "queue_budget": self.queue_budget,
+                "shed_total": dict(self._shed_counts),
+            }
+
+    # ------------------------------------------------------------------
+    # Internals (call with the lock held)
+    # ------------------------------------------------------------------
+    def _expire_locked(self, now: float) -> None:
+        cutoff = now - self.window_s
+        while self._latencies and self._latencies[0][0] < cutoff:
+            self._latencies.popleft()
+
+    def _mean_latency_locked(self) -> float:
+        self._expire_locked(time.monotonic())
+        if not self._latencies:
+            return 0.0
+        return sum(lat for _, lat in self._latencies) / len(self._latencies)
+
+    def _pressure_locked(self, queue_depth: int) -> float:
+        return max(
+            queue_depth / self.queue_budget,
+            self._mean_latency_locked() / self.latency_budget_s,
+        )
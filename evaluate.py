@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+"""
+Evaluation harness over a cached, preprocessed validation set.
+
+The labelled validation set (one folder per class, ``aifake`` / ``fake`` /
+``real`` by default) is decoded and resized to 224x224 exactly once, in
+parallel, into a memory-mapped uint8 array under ``--cache-dir``. The
+cache is keyed on every file's path, size and mtime and rebuilt only when
+the set changes.
+
+Every evaluation then reads straight from that array: each variant (a
+normalization x backend / checkpoint combination) is run over the whole
+set in batches, with ToTensor + Normalize applied to the cached uint8
+pixels (the same result as the serving transform, minus the decode and
+resize). For each variant it reports accuracy, the confusion matrix,
+per-class precision / recall / F1 and the latency per image.
+
+Usage:
+    python evaluate.py data/val
+    python evaluate.py data/val --norm serving imagenet none --backend eager int8 --json eval.json
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+from image_decode import decode_image
+from inference_backends import create_backend
+from model_loader import CLASS_NAMES, MODEL_PATH, load_model
+
+
+IMAGE_SIZE = 224
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".avif", ".webp")
+
+# Validation folder -> class index (see CLASS_NAMES)
+DEFAULT_CLASS_DIRS = {"aifake": 0, "fake": 1, "real": 2}
+
+# Normalization variants (mean, std); "serving" is what build_transform uses
+NORMALIZATIONS = {
+    "serving": ([0.5, 0.5, 0.5], [0.5, 0.5, 0.5]),
+    "imagenet": ([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+    "none": ([0.0, 0.0, 0.0], [1.0, 1.0, 1.0]),
+}
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+def list_dataset(data_dir, class_dirs):
+    """Sorted ``(path, label)`` pairs for every image in the class folders."""
+
+    items = []
+    for folder, label in sorted(class_dirs.items()):
+        root = os.path.join(data_dir, folder)
+        if not os.path.isdir(root):
+            print(f"[EVAL] Missing class folder: {root}")
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            items.extend((os.path.join(dirpath, n), label) for n in sorted(filenames)
+                         if n.lower().endswith(IMAGE_EXTENSIONS))
+    return items
+
+
+def dataset_fingerprint(items, draft):
+    digest = hashlib.sha256(f"{IMAGE_SIZE}:{draft}".encode())
+    for path, label in items:
+        st = os.stat(path)
+        digest.update(f"{path}\0{label}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+_worker_cache = None
+
+
+def _init_cache_worker(images_path, count, draft):
+    global _worker_cache
+    _worker_cache = (np.memmap(images_path, dtype=np.uint8, mode="r+", shape=(count, IMAGE_SIZE, IMAGE_SIZE, 3)), draft)
+
+
+def _decode_into_cache(job):
+    index, path = job
+    images, draft = _worker_cache
+    try:
+        img = decode_image(path, draft=draft)
+        # Same resize as build_transform's transforms.Resize on a PIL image
+        images[index] = np.asarray(img.resize((IMAGE_SIZE, IMAGE_SIZE), Image.BILINEAR))
+        return index, None
+    except Exception as e:
+        return index, f"{type(e).__name__}: {e}"
+
+
+def load_or_build_cache(data_dir, cache_dir, class_dirs, workers, draft=True):
+    """Return ``(images memmap (N, 224, 224, 3) uint8, labels, paths)``, building the cache if stale."""
+
+    items = list_dataset(data_dir, class_dirs)
+    if not items:
+        raise SystemExit(f"[EVAL] No images found under {data_dir}")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    images_path = os.path.join(cache_dir, "images.u8")
+    meta_path = os.path.join(cache_dir, "meta.json")
+    fingerprint = dataset_fingerprint(items, draft)
+
+    if os.path.exists(meta_path) and os.path.exists(images_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("fingerprint") == fingerprint:
+            images = np.memmap(images_path, dtype=np.uint8, mode="r", shape=tuple(meta["shape"]))
+            print(f"[EVAL] Using cached set: {len(meta['paths'])} images ({cache_dir})")
+            return images, np.asarray(meta["labels"], dtype=np.int64), meta["paths"]
+
+    start = time.perf_counter()
+    count = len(items)
+    shape = (count, IMAGE_SIZE, IMAGE_SIZE, 3)
+    np.memmap(images_path, dtype=np.uint8, mode="w+", shape=shape).flush()
+
+    errors = {}
+    jobs = [(i, path) for i, (path, _label) in enumerate(items)]
+    with multiprocessing.Pool(max(1, workers), initializer=_init_cache_worker,
+                              initargs=(images_path, count, draft)) as pool:
+        for index, error in pool.imap_unordered(_decode_into_cache, jobs, chunksize=16):
+            if error:
+                errors[index] = error
+                print(f"[EVAL] Skipping {items[index][0]}: {error}")
+
+    # Compact away images that failed to decode
+    keep = [i for i in range(count) if i not in errors]
+    if errors:
+        full = np.memmap(images_path, dtype=np.uint8, mode="r", shape=shape)
+        compacted = np.ascontiguousarray(full[keep])
+        del full
+        shape = compacted.shape
+        out = np.memmap(images_path, dtype=np.uint8, mode="w+", shape=shape)
+        out[:] = compacted
+        out.flush()
+        del out
+
+    meta = {
+        "fingerprint": fingerprint,
+        "shape": list(shape),
+        "paths": [items[i][0] for i in keep],
+        "labels": [items[i][1] for i in keep],
+        "skipped": {items[i][0]: e for i, e in errors.items()},
+    }
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    print(f"[EVAL] Cached {len(keep)} images in {time.perf_counter() - start:.1f}s "
+          f"({len(errors)} skipped, {np.prod(shape) / 2**20:.0f} MiB)")
+    images = np.memmap(images_path, dtype=np.uint8, mode="r", shape=shape)
+    return images, np.asarray(meta["labels"], dtype=np.int64), meta["paths"]
+
+
+# ----------------------------------------------------------------------
+# Evaluation
+# ----------------------------------------------------------------------
+def to_batch(images_u8, norm):
+    """ToTensor + Normalize for a (B, H, W, 3) uint8 array -> (B, 3, H, W) float tensor."""
+
+    mean, std = NORMALIZATIONS[norm]
+    x = torch.from_numpy(np.array(images_u8))  # copy out of the read-only memmap
+    x = x.permute(0, 3, 1, 2).float().div_(255.0)
+    return (x - torch.tensor(mean).view(1, 3, 1, 1)) / torch.tensor(std).view(1, 3, 1, 1)
+
+
+def evaluate_variant(backend, images, labels, norm, batch_size):
+    num_classes = len(CLASS_NAMES)
+    predictions = np.empty(len(labels), dtype=np.int64)
+    batch_ms = []
+
+    backend.predict_proba(to_batch(images[:1], norm))  # warm-up
+    for start in range(0, len(labels), batch_size):
+        batch = to_batch(images[start:start + batch_size], norm)
+        t0 = time.perf_counter()
+        probs = backend.predict_proba(batch)
+        batch_ms.append((time.perf_counter() - t0) * 1000.0 / len(batch))
+        predictions[start:start + len(batch)] = probs.argmax(dim=1).numpy()
+
+    confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+    np.add.at(confusion, (labels, predictions), 1)
+    per_class = {}
+    for c in range(num_classes):
+        tp = confusion[c, c]
+        predicted = confusion[:, c].sum()
+        actual = confusion[c, :].sum()
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / actual if actual else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_class[CLASS_NAMES[c]] = {"precision": float(precision), "recall": float(recall),
+                                     "f1": float(f1), "support": int(actual)}
+
+    return {
+        "accuracy": float(np.trace(confusion) / max(1, confusion.sum())),
+        "confusion": confusion.tolist(),
+        "per_class": per_class,
+        "latency_ms_per_image": {
+            "mean": float(np.mean(batch_ms)),
+            "p50": float(np.percentile(batch_ms, 50)),
+            "p95": float(np.percentile(batch_ms, 95)),
+        },
+    }
+
+
+def print_report(name, result):
+    names = [CLASS_NAMES[i] for i in range(len(CLASS_NAMES))]
+    print(f"\n    {'─' * 75}")
+    print(f"    VARIANT: {name}")
+    print(f"    {'─' * 75}")
+    lat = result["latency_ms_per_image"]
+    print(f"    Accuracy: {result['accuracy'] * 100:.2f}%   "
+          f"latency {lat['mean']:.1f} ms/img (p50 {lat['p50']:.1f}, p95 {lat['p95']:.1f})")
+    print(f"\n    Confusion (rows = true, columns = predicted)")
+    print("    " + " " * 20 + "".join(f"{n[:12]:>14s}" for n in names))
+    for name_row, row in zip(names, result["confusion"]):
+        print(f"    {name_row:20s}" + "".join(f"{v:14d}" for v in row))
+    print(f"\n    {'class':20s} {'precision':>10s} {'recall':>10s} {'f1':>10s} {'support':>9s}")
+    for cls, m in result["per_class"].items():
+        print(f"    {cls:20s} {m['precision'] * 100:9.2f}% {m['recall'] * 100:9.2f}% "
+              f"{m['f1'] * 100:9.2f}% {m['support']:9d}")
+
+
+def parse_class_dirs(spec):
+    if not spec:
+        return DEFAULT_CLASS_DIRS
+    return {folder: int(index) for folder, index in (part.split("=") for part in spec.split(","))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data_dir", help="validation set with one folder per class")
+    parser.add_argument("--class-dirs", default=None,
+                        help="folder=index pairs (default: aifake=0,fake=1,real=2)")
+    parser.add_argument("--cache-dir", default=None, help="default: <data_dir>/.eval_cache")
+    parser.add_argument("--rebuild-cache", action="store_true")
+    parser.add_argument("--full-decode", action="store_true", help="disable the reduced-resolution JPEG decode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="decoding processes for the cache")
+    parser.add_argument("--norm", nargs="+", default=["serving"], choices=sorted(NORMALIZATIONS))
+    parser.add_argument("--backend", nargs="+", default=["eager"],
+                        help="inference backends to compare (eager, int8, torchscript, compile, onnx, bf16, ...)")
+    parser.add_argument("--model", nargs="+", default=[MODEL_PATH], help="checkpoints to compare")
+    parser.add_argument("--backend-cache-dir", default=os.getenv("MODEL_CACHE_DIR", "model_cache"))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    parser.add_argument("--json", default=None, help="also write all results to this file")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    cache_dir = args.cache_dir or os.path.join(args.data_dir, ".eval_cache")
+    if args.rebuild_cache:
+        for name in ("meta.json", "images.u8"):
+            if os.path.exists(os.path.join(cache_dir, name)):
+                os.remove(os.path.join(cache_dir, name))
+
+    start = time.perf_counter()
+    images, labels, _paths = load_or_build_cache(
+        args.data_dir, cache_dir, parse_class_dirs(args.class_dirs), args.workers, draft=not args.full_decode
+    )
+
+    print("\n" + "=" * 80)
+    print(f"EVALUATION ({len(labels)} images: " + ", ".join(
+        f"{CLASS_NAMES[c]} {int((labels == c).sum())}" for c in range(len(CLASS_NAMES))) + ")")
+    print("=" * 80)
+
+    results = {}
+    for model_path in args.model:
+        model = load_model(model_path, "cpu")
+        for backend_name in args.backend:
+            backend = create_backend(backend_name, model, "cpu", model_path, cache_dir=args.backend_cache_dir)
+            for norm in args.norm:
+                name = f"{os.path.basename(model_path)} / {backend.name} / norm={norm}"
+                results[name] = evaluate_variant(backend, images, labels, norm, args.batch_size)
+                print_report(name, results[name])
+
+    print("\n" + "=" * 80)
+    print(f"    {'variant':56s} {'accuracy':>9s} {'ms/img':>8s}")
+    for name, result in results.items():
+        print(f"    {name:56s} {result['accuracy'] * 100:8.2f}% {result['latency_ms_per_image']['mean']:8.1f}")
+    print(f"\n    Total time: {time.perf_counter() - start:.1f}s")
+    print("=" * 80 + "\n")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"images": int(len(labels)), "variants": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,7 +12,8 @@ from __future__ import annotations
 import cv2
 import numpy as np
 import torch
-from typing import Tuple
+from functools import lru_cache
+from typing import Optional, Tuple
 
 
 def _get_last_encoder_norm(model: torch.nn.Module) -> torch.nn.Module:
@@ -69,6 +70,27 @@ def generate_vit_gradcam_map(
     torchvision ViT versions and produces a reliable token-importance map.
     """
 
+    input_tensor = transform(pil_image).unsqueeze(0).to(device)
+    cam, _ = generate_vit_gradcam_from_tensor(model, input_tensor, target_index, resize=resize)
+    return cam
+
+
+def generate_vit_gradcam_from_tensor(
+    model: torch.nn.Module,
+    input_tensor: torch.Tensor,
+    target_index: Optional[int] = None,
+    resize: Tuple[int, int] = (224, 224),
+) -> Tuple[np.ndarray, torch.Tensor]:
+    """Grad-CAM from an already preprocessed ``(1, 3, H, W)`` tensor.
+
+    The Grad-CAM forward pass also produces the logits, so callers that need
+    both a prediction and a heatmap can skip a separate inference pass: with
+    ``target_index=None`` the predicted (argmax) class is explained.
+
+    Returns:
+        ``(heatmap, logits)`` where logits are detached, shape (1, num_classes).
+    """
+
     model.eval()
 
     activations = {}
@@ -87,22 +109,23 @@ def generate_vit_gradcam_map(
 
     try:
         # Prepare input tensor with gradients enabled
-        input_tensor = transform(pil_image).unsqueeze(0).to(device)
-        input_tensor.requires_grad_(True)
+        input_tensor = input_tensor.detach().requires_grad_(True)
 
         # Forward pass
-        logits = model(input_tensor)
-        if logits.ndim != 2 or logits.size(0) != 1:
-            raise RuntimeError("Unexpected logits shape for Grad-CAM: %r" % (tuple(logits.shape),))
+        with torch.enable_grad():
+            logits = model(input_tensor)
+            if logits.ndim != 2 or logits.size(0) != 1:
+                raise RuntimeError("Unexpected logits shape for Grad-CAM: %r" % (tuple(logits.shape),))
+
+            if target_index is None:
+                target_index = int(logits[0].argmax().item())
 
-        # Select logit for target class
-        target_logit = logits[0, target_index]
+            # Select logit for target class
+            target_logit = logits[0, target_index]
 
-        # Backward to get gradients at target layer
-        model.zero_grad()
-        if input_tensor.grad is not None:
-            input_tensor.grad.zero_()
-        target_logit.backward()
+            # Backward to get gradients at target layer
+            model.zero_grad()
+            target_logit.backward()
 
         if "value" not in gradients or "value" not in activations:
             raise RuntimeError("Failed to capture gradients/activations for Grad-CAM")
@@ -139,48 +162,101 @@ def generate_vit_gradcam_map(
         if cam_resized.max() > 0:
             cam_resized = cam_resized / cam_resized.max()
 
-        return cam_resized
+        return cam_resized, logits.detach()
     finally:
         handle_fwd.remove()
         handle_bwd.remove()
 
 
+@lru_cache(maxsize=None)
+def _colormap_lut(colormap: int) -> np.ndarray:
+    """(256, 1, 3) uint8 lookup table for an OpenCV colormap, in RGB order.
+
+    Passed to ``cv2.applyColorMap`` as a user colormap, it maps a uint8
+    heatmap straight to RGB with no BGR->RGB conversion pass.
+    """
+
+    gray = np.arange(256, dtype=np.uint8).reshape(256, 1)
+    lut = cv2.applyColorMap(gray, colormap)[:, :, ::-1]  # BGR -> RGB
+    lut = np.ascontiguousarray(lut)
+    lut.setflags(write=False)
+    return lut
+
+
+def _heatmap_to_uint8(heatmap: np.ndarray) -> np.ndarray:
+    heatmap = np.asarray(heatmap, dtype=np.float32)
+    return (np.clip(heatmap, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+
 def overlay_heatmap_on_image(
     pil_image,
     heatmap: np.ndarray,
     alpha: float = 0.5,
     colormap: int = cv2.COLORMAP_JET,
+    full_resolution: bool = False,
 ):
     """Overlay a heatmap on top of a PIL RGB image.
 
     Args:
-        pil_image: PIL.Image RGB
+        pil_image: PIL.Image RGB, or an (H, W, 3) uint8 RGB array
         heatmap: 2D numpy array in [0, 1]
         alpha: blending factor between heatmap and original image
         colormap: OpenCV colormap id (default: JET)
+        full_resolution: upscale the heatmap to the image instead of
+            downscaling the image to the heatmap
 
     Returns:
-        PIL.Image RGB with heatmap overlay.
+        RGB overlay, as a PIL.Image for PIL input and a uint8 array for array input.
     """
 
     from PIL import Image  # imported here to avoid circular dependencies
 
-    # Ensure heatmap is float32 in [0, 1]
-    heatmap = np.asarray(heatmap, dtype=np.float32)
-    heatmap = np.clip(heatmap, 0.0, 1.0)
+    heatmap_u8 = _heatmap_to_uint8(heatmap)
+    h, w = heatmap_u8.shape
+    is_array = isinstance(pil_image, np.ndarray)
+
+    if full_resolution:
+        image_np = pil_image if is_array else np.asarray(pil_image)
+        if image_np.shape[:2] != (h, w):
+            heatmap_u8 = cv2.resize(heatmap_u8, (image_np.shape[1], image_np.shape[0]), interpolation=cv2.INTER_LINEAR)
+    elif is_array:
+        image_np = pil_image
+        if image_np.shape[:2] != (h, w):
+            image_np = cv2.resize(image_np, (w, h), interpolation=cv2.INTER_AREA)
+    else:
+        # Resize original image to match heatmap spatial size
+        image_np = np.asarray(pil_image if pil_image.size == (w, h) else pil_image.resize((w, h)))
+
+    # Colormap straight to RGB through the cached LUT, then blend in uint8
+    heatmap_color = cv2.applyColorMap(heatmap_u8, _colormap_lut(colormap))
+    overlay = cv2.addWeighted(heatmap_color, alpha, np.ascontiguousarray(image_np), 1.0 - alpha, 0.0)
 
-    # Resize original image to match heatmap spatial size
-    h, w = heatmap.shape
-    image_resized = pil_image.resize((w, h))
-    image_np = np.array(image_resized, dtype=np.float32)
+    return overlay if is_array else Image.fromarray(overlay)
 
-    # Convert heatmap to color
-    heatmap_uint8 = np.uint8(255 * heatmap)
-    heatmap_color = cv2.applyColorMap(heatmap_uint8, colormap)
-    heatmap_color = cv2.cvtColor(heatmap_color, cv2.COLOR_BGR2RGB).astype(np.float32)
 
-    # Blend
-    overlay = alpha * heatmap_color + (1.0 - alpha) * image_np
-    overlay = np.clip(overlay, 0, 255).astype(np.uint8)
+def overlay_heatmaps_batch(
+    images: np.ndarray,
+    heatmaps: np.ndarray,
+    alpha: float = 0.5,
+    colormap: int = cv2.COLORMAP_JET,
+) -> np.ndarray:
+    """Overlay N heatmaps on N same-sized images in one vectorized pass.
+
+    Args:
+        images: (N, H, W, 3) uint8 RGB array (e.g. resized video frames)
+        heatmaps: (N, H, W) array in [0, 1], same spatial size as ``images``
+
+    Returns:
+        (N, H, W, 3) uint8 RGB overlays.
+    """
+
+    images = np.ascontiguousarray(images, dtype=np.uint8)
+    heatmap_u8 = _heatmap_to_uint8(heatmaps)
+    if images.shape[:3] != heatmap_u8.shape:
+        raise ValueError(f"images {images.shape} and heatmaps {heatmap_u8.shape} must match")
 
-    return Image.fromarray(overlay)
\ No newline at end of file
+    # OpenCV works on 2D images; stack the batch vertically
+    n, h, w, _ = images.shape
+    heatmap_color = cv2.applyColorMap(heatmap_u8.reshape(n * h, w), _colormap_lut(colormap))
+    blended = cv2.addWeighted(heatmap_color, alpha, images.reshape(n * h, w, 3), 1.0 - alpha, 0.0)
+    return blended.reshape(n, h, w, 3)
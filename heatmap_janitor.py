@@ -0,0 +1,186 @@
+"""Background deletion of expired heatmap files.
+
+Replaces the per-request directory scan with an in-memory expiry index:
+a min-heap of ``(created_at, path)``. The index is built once by scanning
+``uploads/image_heatmaps``, ``uploads/video_heatmaps`` and
+``uploads/heatmap_tokens`` (shared lazy-heatmap tokens) when the janitor
+starts; afterwards writers register new files with ``track`` and the scan
+never happens again. The janitor thread sleeps until the oldest entry
+expires (or ``trigger`` is called), deletes at most ``batch_size`` files
+per pass and removes per-video directories once they are empty.
+
+An entry whose file was rewritten since it was indexed is re-queued with
+the newer mtime instead of being deleted.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+HEATMAP_SUBDIRS = ("image_heatmaps", "video_heatmaps", "heatmap_tokens")
+HEATMAP_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".webm", ".mp4", ".npz")
+
+
+class HeatmapJanitor:
+    """Expiry-index driven cleaner for generated heatmap files."""
+
+    def __init__(
+        self,
+        upload_folder: str,
+        max_age_s: float = 3600.0,
+        batch_size: int = 100,
+        batch_pause_s: float = 0.05,
+        idle_interval_s: float = 300.0,
+    ):
+        self.upload_folder = upload_folder
+        self.roots = [os.path.join(upload_folder, d) for d in HEATMAP_SUBDIRS]
+        self.max_age_s = max_age_s
+        self.batch_size = max(1, batch_size)
+        self.batch_pause_s = batch_pause_s
+        self.idle_interval_s = idle_interval_s
+
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, str]] = []
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._deleted = 0
+        self._dirs_removed = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def start(self) -> "HeatmapJanitor":
+        self._thread = threading.Thread(target=self._run, name="heatmap-janitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._wake.set()
+
+    def track(self, path: str, created_at: Optional[float] = None) -> None:
+        """Register a newly written heatmap file for expiry."""
+
+        entry = (created_at if created_at is not None else time.time(), path)
+        with self._lock:
+            heapq.heappush(self._heap, entry)
+            is_head = self._heap[0] is entry
+        if is_head:
+            # The thread may be in the idle wait (empty heap) or waiting for a
+            # later head; wake it to recompute its deadline
+            self._wake.set()
+
+    def trigger(self) -> None:
+        """Ask the janitor to run a pass now (e.g. from the /cleanup endpoint)."""
+
+        self._wake.set()
+
+    def rebuild(self) -> int:
+        """Rebuild the expiry index from disk; returns the number of files indexed."""
+
+        entries = []
+        for root in self.roots:
+            for dirpath, _dirnames, filenames in os.walk(root):
+                for name in filenames:
+                    if name.lower().endswith(HEATMAP_EXTENSIONS):
+                        path = os.path.join(dirpath, name)
+                        try:
+                            entries.append((os.path.getmtime(path), path))
+                        except OSError:
+                            pass
+        heapq.heapify(entries)
+        with self._lock:
+            # Keep anything tracked while the scan was running
+            for entry in self._heap:
+                heapq.heappush(entries, entry)
+            self._heap = entries
+        return len(entries)
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """Delete up to ``batch_size`` expired files; returns how many were deleted."""
+
+        now = time.time() if now is None else now
+        cutoff = now - self.max_age_s
+        deleted = 0
+
+        for _ in range(self.batch_size):
+            with self._lock:
+                if not self._heap or self._heap[0][0] > cutoff:
+                    break
+                _created_at, path = heapq.heappop(self._heap)
+
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue  # already gone
+
+            if mtime > cutoff:
+                # Rewritten since it was indexed
+                self.track(path, mtime)
+                continue
+
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                continue  # deleted by another process's janitor (serve_prefork workers)
+            except OSError as e:
+                print(f"[CLEANUP] Error deleting {path}: {e}")
+                continue
+            self._remove_empty_parent(path)
+
+        if deleted:
+            self._deleted += deleted
+            print(f"[CLEANUP] Deleted {deleted} expired heatmap(s)")
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            oldest = self._heap[0][0] if self._heap else None
+            return {
+                "indexed": len(self._heap),
+                "oldest_age_s": round(time.time() - oldest, 1) if oldest is not None else None,
+                "deleted_total": self._deleted,
+                "dirs_removed_total": self._dirs_removed,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _remove_empty_parent(self, path: str) -> None:
+        parent = os.path.dirname(path)
+        if parent in self.roots:
+            return
+        try:
+            os.rmdir(parent)  # only succeeds once the per-video directory is empty
+            self._dirs_removed += 1
+        except OSError:
+            pass
+
+    def _next_wait(self) -> float:
+        with self._lock:
+            if not self._heap:
+                return self.idle_interval_s
+            due = self._heap[0][0] + self.max_age_s - time.time()
+        return min(self.idle_interval_s, max(0.0, due))
+
+    def _run(self) -> None:
+        count = self.rebuild()
+        print(f"[CLEANUP] Heatmap janitor indexed {count} file(s)")
+
+        while not self._stopped:
+            self._wake.wait(self._next_wait())
+            self._wake.clear()
+            if self._stopped:
+                break
+
+            # Bounded batches with a short pause so a large backlog never
+            # monopolizes the disk
+            while self.run_once() == self.batch_size and not self._stopped:
+                time.sleep(self.batch_pause_s)
@@ -0,0 +1,218 @@
+"""Pending Grad-CAM heatmaps, rendered only when a client asks for them.
+
+``/predict`` no longer runs Grad-CAM. It stores the preprocessed input
+(as the lossless uint8 image, see ``model_loader.tensor_to_uint8``) and the
+target class under an unguessable token and returns ``/heatmap/<token>``.
+Forward-only explanations (attention rollout) are already computed by
+then and are stored as the finished heatmap.
+The first fetch of that URL renders and encodes the overlay; later
+fetches are served from the memoized bytes. Clients that never look at the heatmap cost one
+small dict entry, evicted oldest-first once ``max_entries`` is reached or
+after ``ttl_s`` seconds.
+
+With ``directory`` set (several processes serving the same clients, e.g.
+``serve_prefork.py`` workers), every token is also written there as
+``<token>.npz`` and the rendered overlay as ``<token>.rendered.npz``, so
+the fetch can land on any process. The in-memory map is then only a cache
+of the directory; ``on_saved`` is called with each file written (the app
+registers them with the heatmap janitor, which deletes them after the
+same retention as other heatmap files). Render results must then be
+``(bytes, mimetype)`` pairs. Two processes fetching the same new token
+at the same moment may both render it; the files are replaced atomically.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+
+# Tokens are secrets.token_urlsafe(16); anything else never touches the disk
+_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+class HeatmapExpired(KeyError):
+    """Unknown or expired heatmap token."""
+
+
+class _Entry:
+    __slots__ = ("image", "target_index", "heatmap", "result", "created_at", "lock")
+
+    def __init__(self, image: Optional[np.ndarray], target_index: int, heatmap: Optional[np.ndarray],
+                 created_at: Optional[float] = None):
+        self.image = image
+        self.target_index = target_index
+        self.heatmap = heatmap
+        self.result: Optional[Any] = None
+        self.created_at = time.time() if created_at is None else created_at
+        self.lock = threading.Lock()
+
+
+class HeatmapStore:
+    """Bounded token -> pending/rendered heatmap map with per-token render locks."""
+
+    def __init__(self, max_entries: int = 256, ttl_s: float = 3600.0, directory: Optional[str] = None,
+                 on_saved: Optional[Callable[[str], None]] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self.directory = directory
+        self.on_saved = on_saved
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._rendered = 0
+        self._hits = 0
+        self._loaded = 0
+
+    def put(self, image: np.ndarray, target_index: int, heatmap: Optional[np.ndarray] = None) -> str:
+        """Register a pending heatmap and return its token.
+
+        Args:
+            image: (224, 224, 3) uint8 model input
+            target_index: class to explain
+            heatmap: already computed heatmap (kept as float16), if any
+        """
+
+        if heatmap is not None:
+            heatmap = np.asarray(heatmap, dtype=np.float16)
+
+        token = secrets.token_urlsafe(16)
+        if self.directory:
+            arrays = {"image": image, "target_index": np.int64(target_index)}
+            if heatmap is not None:
+                arrays["heatmap"] = heatmap
+            self._save(self._pending_path(token), arrays)
+        with self._lock:
+            self._entries[token] = _Entry(image, target_index, heatmap)
+            self._evict_locked()
+        return token
+
+    def render(self, token: str, render_fn: Callable[[np.ndarray, int, Optional[np.ndarray]], Any]) -> Any:
+        """Return the rendered heatmap for ``token``, rendering it on first use.
+
+        Whatever ``render_fn(image, target_index, heatmap)`` returns (e.g. the
+        encoded overlay) is memoized. Concurrent fetches of the same token
+        wait for a single render.
+
+        Raises:
+            HeatmapExpired: the token is unknown or has expired.
+        """
+
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and time.time() - entry.created_at > self.ttl_s:
+                del self._entries[token]
+                entry = None
+        if entry is None and self.directory and _TOKEN_RE.match(token):
+            # Issued (or already rendered) by another process
+            entry = self._load(token)
+            if entry is not None:
+                with self._lock:
+                    self._loaded += 1
+                    entry = self._entries.setdefault(token, entry)
+                    self._evict_locked()
+        if entry is None:
+            raise HeatmapExpired(token)
+
+        with entry.lock:
+            if entry.result is None and self.directory:
+                # Another process may have rendered it since this one cached the entry
+                rendered = self._load_rendered(token)
+                if rendered is not None:
+                    entry.result = rendered
+                    entry.image = None
+                    entry.heatmap = None
+            if entry.result is not None:
+                with self._lock:
+                    self._hits += 1
+                return entry.result
+
+            entry.result = render_fn(entry.image, entry.target_index, entry.heatmap)
+            # Only the rendered result is needed from now on
+            entry.image = None
+            entry.heatmap = None
+            with self._lock:
+                self._rendered += 1
+            if self.directory:
+                data, mimetype = entry.result
+                self._save(self._rendered_path(token),
+                           {"data": np.frombuffer(data, dtype=np.uint8), "mimetype": np.array(mimetype)})
+                try:
+                    os.remove(self._pending_path(token))
+                except OSError:
+                    pass
+            return entry.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(1 for e in self._entries.values() if e.result is None)
+            return {
+                "entries": len(self._entries),
+                "pending": pending,
+                "rendered_total": self._rendered,
+                "memoized_hits": self._hits,
+                "shared_dir": self.directory,
+                "loaded_from_dir_total": self._loaded,
+            }
+
+    # ------------------------------------------------------------------
+    # Shared directory
+    # ------------------------------------------------------------------
+    def _pending_path(self, token: str) -> str:
+        return os.path.join(self.directory, f"{token}.npz")
+
+    def _rendered_path(self, token: str) -> str:
+        return os.path.join(self.directory, f"{token}.rendered.npz")
+
+    def _save(self, path: str, arrays: dict) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        if self.on_saved is not None:
+            self.on_saved(path)
+
+    def _read(self, path: str) -> Optional[dict]:
+        try:
+            mtime = os.path.getmtime(path)
+            if time.time() - mtime > self.ttl_s:
+                return None
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            return None
+        arrays["_mtime"] = mtime
+        return arrays
+
+    def _load_rendered(self, token: str) -> Optional[Any]:
+        arrays = self._read(self._rendered_path(token))
+        if arrays is None:
+            return None
+        return arrays["data"].tobytes(), str(arrays["mimetype"])
+
+    def _load(self, token: str) -> Optional[_Entry]:
+        rendered = self._load_rendered(token)
+        arrays = None if rendered is not None else self._read(self._pending_path(token))
+        if rendered is None and arrays is None:
+            # The pending file is removed right after the rendered one is written
+            rendered = self._load_rendered(token)
+        if rendered is not None:
+            entry = _Entry(None, 0, None)
+            entry.result = rendered
+            return entry
+        if arrays is None:
+            return None
+        return _Entry(arrays["image"], int(arrays["target_index"]), arrays.get("heatmap"),
+                      created_at=arrays["_mtime"])
+
+    def _evict_locked(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
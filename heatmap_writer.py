@@ -0,0 +1,97 @@
+"""Heatmap overlay encoding and background file writing.
+
+PNG at the default compression level is the slowest way to store a
+Grad-CAM overlay, and the overlay is a photo-like image that compresses
+well lossily. ``HEATMAP_FORMATS`` lists the supported encodings (run
+``benchmarks/benchmark_heatmap_formats.py`` to compare latency vs size on
+the target host):
+
+    jpeg  quality 85 (default)
+    webp  quality 80, fastest encoder method
+    png   lossless, zlib level 1
+
+``HeatmapWriter`` encodes and writes overlays on a small thread pool (PIL
+releases the GIL while compressing), so callers such as
+``VideoProcessor.process_video`` can move on to the next frame while the
+previous overlay is being saved. Files are written to a temporary name and
+renamed, so a half-written heatmap is never served.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+# name -> (PIL format, file extension, mimetype, save options)
+HEATMAP_FORMATS = {
+    "jpeg": ("JPEG", ".jpg", "image/jpeg", {"quality": 85}),
+    "webp": ("WEBP", ".webp", "image/webp", {"quality": 80, "method": 0}),
+    "png": ("PNG", ".png", "image/png", {"compress_level": 1}),
+}
+
+
+def _format_spec(fmt: str):
+    spec = HEATMAP_FORMATS.get(fmt.lower())
+    if spec is None:
+        raise ValueError(f"Unknown heatmap format '{fmt}', expected one of {sorted(HEATMAP_FORMATS)}")
+    return spec
+
+
+def encode_overlay(pil_image, fmt: str = "jpeg") -> bytes:
+    """Encode an RGB overlay in one of ``HEATMAP_FORMATS``."""
+
+    pil_format, _ext, _mimetype, options = _format_spec(fmt)
+    buf = io.BytesIO()
+    pil_image.save(buf, format=pil_format, **options)
+    return buf.getvalue()
+
+
+class HeatmapWriter:
+    """Thread pool that encodes overlays and writes them to disk atomically."""
+
+    def __init__(self, fmt: str = "jpeg", workers: int = 2):
+        _format_spec(fmt)
+        self.format = fmt.lower()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="heatmap-writer")
+
+    @property
+    def extension(self) -> str:
+        return HEATMAP_FORMATS[self.format][1]
+
+    @property
+    def mimetype(self) -> str:
+        return HEATMAP_FORMATS[self.format][2]
+
+    def encode(self, pil_image) -> bytes:
+        return encode_overlay(pil_image, self.format)
+
+    def submit(
+        self,
+        pil_image,
+        path_stem: str,
+        on_written: Optional[Callable[[str], None]] = None,
+    ) -> "Future[str]":
+        """Encode and save ``pil_image`` to ``path_stem`` + extension in the background.
+
+        The future resolves to the written path. ``on_written(path)`` runs on
+        the writer thread once the file is in place.
+        """
+
+        return self._executor.submit(self._write, pil_image, path_stem + self.extension, on_written)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _write(self, pil_image, path: str, on_written) -> str:
+        data = self.encode(pil_image)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        if on_written is not None:
+            on_written(path)
+        return path
@@ -0,0 +1,397 @@
+"""Pluggable inference backends for the ViT-B/16 classifier.
+
+Every backend is a callable taking a preprocessed ``(B, 3, 224, 224)`` tensor
+and returning ``(B, num_classes)`` logits as a CPU-or-device torch tensor, so
+``/predict`` and ``VideoProcessor`` can call any of them the same way.
+
+Available backends:
+    eager        the plain fp32 ``nn.Module`` (reference)
+    int8         dynamic INT8 quantization (see ``quantize_vit``), CPU only
+    torchscript  traced + frozen TorchScript module
+    compile      ``torch.compile`` (inductor) wrapper
+    onnx         ONNX Runtime CPU session (requires ``onnxruntime``)
+    autocast     fp32 weights, forward under bfloat16 autocast
+    bf16         bfloat16 copy of the weights
+
+The two reduced-precision backends rely on bf16 matmul support (AVX512-BF16 /
+AMX on recent server CPUs) for their speed-up and are always guarded by a
+parity check before being served.
+
+Compiled artifacts are cached under ``cache_dir`` keyed by the hash of the
+checkpoint, so startup only pays the export cost once per set of weights.
+"""
+
+from __future__ import annotations
+
+import copy
+import glob
+import json
+import os
+import statistics
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from model_loader import checkpoint_fingerprint
+
+
+BACKEND_NAMES = ("eager", "int8", "torchscript", "compile", "onnx", "autocast", "bf16")
+# Backends INFERENCE_BACKEND=auto may pick: reduced precision (autocast, bf16)
+# stays opt-in per request through REDUCED_PRECISION
+AUTO_BACKENDS = ("eager", "int8", "torchscript", "compile", "onnx")
+
+# Where benchmarks/benchmark_backends.py records the fastest backend for this host
+BACKEND_CHOICE_FILE = "backend_choice.json"
+
+
+class InferenceBackend:
+    """Base backend: wraps an fp32 ``nn.Module`` and runs it without autograd."""
+
+    name = "eager"
+
+    def __init__(self, model: torch.nn.Module, device: torch.device | str):
+        self.model = model
+        self.device = device
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(x.to(self.device))
+
+    def predict_proba(self, x: torch.Tensor) -> torch.Tensor:
+        """Softmax probabilities on CPU for a batch of inputs."""
+
+        return F.softmax(self(x).float(), dim=1).cpu()
+
+
+class EagerBackend(InferenceBackend):
+    name = "eager"
+
+
+class Int8Backend(InferenceBackend):
+    """Dynamic INT8 quantized copy of the model (CPU only)."""
+
+    name = "int8"
+
+    def __init__(self, model, device, checkpoint_path, cache_dir):
+        if str(device) != "cpu":
+            raise RuntimeError("INT8 backend is CPU-only")
+        from quantize_vit import load_or_quantize_vit
+
+        super().__init__(load_or_quantize_vit(model, checkpoint_path, cache_dir=cache_dir), device)
+
+
+class TorchScriptBackend(InferenceBackend):
+    """Traced, frozen and inference-optimized TorchScript module."""
+
+    name = "torchscript"
+
+    def __init__(self, model, device, checkpoint_path, cache_dir):
+        cache_path = _artifact_path(cache_dir, checkpoint_path, f"torchscript_{device}", "pt")
+
+        # Only the frozen module is cached: the graph optimize_for_inference
+        # produces cannot be reloaded, so it is re-applied after every load
+        frozen = None
+        if os.path.exists(cache_path):
+            try:
+                frozen = torch.jit.load(cache_path, map_location=device)
+                print(f"[BACKEND] Loaded cached TorchScript module: {cache_path}")
+            except Exception as e:
+                print(f"[BACKEND] Failed to load cached TorchScript module ({e}), re-exporting")
+
+        if frozen is None:
+            example = torch.zeros(1, 3, 224, 224, device=device)
+            with torch.no_grad():
+                traced = torch.jit.trace(model.eval(), example, check_trace=False)
+                frozen = torch.jit.freeze(traced)
+            _save_artifact(cache_path, lambda path: torch.jit.save(frozen, path))
+
+        with torch.no_grad():
+            scripted = torch.jit.optimize_for_inference(frozen)
+        super().__init__(scripted, device)
+
+
+class CompileBackend(InferenceBackend):
+    """``torch.compile`` wrapper.
+
+    Inductor keeps its own on-disk kernel cache, so there is no artifact to
+    manage here; the first call (done at construction) pays the compile cost.
+    """
+
+    name = "compile"
+
+    def __init__(self, model, device, checkpoint_path, cache_dir):  # pylint: disable=unused-argument
+        compiled = torch.compile(model, mode="max-autotune-no-cudagraphs", dynamic=True)
+        with torch.no_grad():
+            compiled(torch.zeros(1, 3, 224, 224, device=device))
+        super().__init__(compiled, device)
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """ONNX Runtime CPU session over an exported ONNX graph."""
+
+    name = "onnx"
+
+    def __init__(self, model, device, checkpoint_path, cache_dir):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("onnxruntime is not installed") from e
+
+        cache_path = _artifact_path(cache_dir, checkpoint_path, "onnx", "onnx")
+
+        if not os.path.exists(cache_path):
+            cpu_model = model if str(device) == "cpu" else _cpu_copy(model)
+
+            def export(path):
+                torch.onnx.export(
+                    cpu_model,
+                    torch.zeros(1, 3, 224, 224),
+                    path,
+                    input_names=["input"],
+                    output_names=["logits"],
+                    dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+                    opset_version=17,
+                )
+
+            _save_artifact(cache_path, export)
+        else:
+            print(f"[BACKEND] Using cached ONNX graph: {cache_path}")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(cache_path, options, providers=["CPUExecutionProvider"])
+        super().__init__(model, "cpu")
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        inputs = x.detach().to("cpu", torch.float32).contiguous().numpy()
+        (logits,) = self.session.run(["logits"], {"input": inputs})
+        return torch.from_numpy(logits)
+
+
+class AutocastBackend(InferenceBackend):
+    """fp32 weights with the forward pass run under bfloat16 autocast."""
+
+    name = "autocast"
+
+    def __init__(self, model, device, checkpoint_path=None, cache_dir=None):  # pylint: disable=unused-argument
+        super().__init__(model, device)
+        self.device_type = str(device).split(":")[0]
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad(), torch.autocast(device_type=self.device_type, dtype=torch.bfloat16):
+            return self.model(x.to(self.device)).float()
+
+
+class Bf16Backend(InferenceBackend):
+    """bfloat16 copy of the weights; inputs are cast to bf16, logits back to fp32."""
+
+    name = "bf16"
+
+    def __init__(self, model, device, checkpoint_path=None, cache_dir=None):  # pylint: disable=unused-argument
+        super().__init__(copy.deepcopy(model).to(device=device, dtype=torch.bfloat16).eval(), device)
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(x.to(self.device, torch.bfloat16)).float()
+
+
+_BACKEND_CLASSES = {
+    "int8": Int8Backend,
+    "torchscript": TorchScriptBackend,
+    "compile": CompileBackend,
+    "onnx": OnnxRuntimeBackend,
+    "autocast": AutocastBackend,
+    "bf16": Bf16Backend,
+}
+
+
+def _cpu_copy(model: torch.nn.Module) -> torch.nn.Module:
+    return copy.deepcopy(model).cpu().eval()
+
+
+def _artifact_path(cache_dir: str, checkpoint_path: str, kind: str, ext: str) -> str:
+    fingerprint = checkpoint_fingerprint(checkpoint_path)[:16]
+    return os.path.join(cache_dir, f"vit3class_{kind}_{fingerprint}.{ext}")
+
+
+def _save_artifact(cache_path: str, save_fn) -> None:
+    """Write an artifact atomically and drop stale ones of the same kind."""
+
+    try:
+        cache_dir = os.path.dirname(cache_path) or "."
+        os.makedirs(cache_dir, exist_ok=True)
+        prefix = os.path.basename(cache_path).rsplit("_", 1)[0]
+        for stale in glob.glob(os.path.join(cache_dir, f"{prefix}_*")):
+            if stale != cache_path:
+                os.remove(stale)
+        tmp_path = cache_path + ".tmp"
+        save_fn(tmp_path)
+        os.replace(tmp_path, cache_path)
+        print(f"[BACKEND] Cached artifact: {cache_path}")
+    except Exception as e:
+        print(f"[BACKEND] Could not cache artifact {cache_path}: {e}")
+
+
+def create_backend(
+    name: str,
+    model: torch.nn.Module,
+    device: torch.device | str,
+    checkpoint_path: str,
+    cache_dir: str = "model_cache",
+) -> InferenceBackend:
+    """Build the named backend, falling back to eager if it cannot be built."""
+
+    name = (name or "eager").lower()
+    if name == "fp32":
+        name = "eager"
+    if name == "auto":
+        name = read_backend_choice(cache_dir) or "eager"
+        print(f"[BACKEND] auto -> {name}")
+
+    if name == "eager":
+        return EagerBackend(model, device)
+
+    backend_cls = _BACKEND_CLASSES.get(name)
+    if backend_cls is None:
+        print(f"[BACKEND] Unknown backend '{name}', using eager")
+        return EagerBackend(model, device)
+
+    try:
+        return backend_cls(model, device, checkpoint_path, cache_dir)
+    except Exception as e:
+        print(f"[BACKEND] Could not build '{name}' backend ({e}), using eager")
+        return EagerBackend(model, device)
+
+
+def read_backend_choice(cache_dir: str = "model_cache") -> str | None:
+    """Return the backend picked by the benchmark for this host, if recorded.
+
+    Only fp32-parity backends (``AUTO_BACKENDS``) are returned, so ``auto``
+    never makes reduced precision the default for every request.
+    """
+
+    try:
+        with open(os.path.join(cache_dir, BACKEND_CHOICE_FILE), "r") as f:
+            choice = json.load(f).get("fastest")
+    except (OSError, ValueError):
+        return None
+    if choice in BACKEND_NAMES and choice not in AUTO_BACKENDS:
+        print(f"[BACKEND] Ignoring recorded reduced-precision choice '{choice}' for auto")
+        return None
+    return choice if choice in AUTO_BACKENDS else None
+
+
+def write_backend_choice(choice: str, results: Dict, cache_dir: str = "model_cache") -> str:
+    """Persist the benchmark winner so ``INFERENCE_BACKEND=auto`` can use it."""
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, BACKEND_CHOICE_FILE)
+    with open(path, "w") as f:
+        json.dump({"fastest": choice, "results": results}, f, indent=2)
+    return path
+
+
+def calibration_inputs(transform, image_dir: str | None = None, count: int = 8) -> List[torch.Tensor]:
+    """Build a small list of (1, 3, 224, 224) inputs for parity checks.
+
+    Uses up to ``count`` images from ``image_dir`` when given, otherwise
+    deterministic synthetic images so the check can always run.
+    """
+
+    from PIL import Image  # imported here to keep module import light
+
+    inputs: List[torch.Tensor] = []
+
+    if image_dir and os.path.isdir(image_dir):
+        exts = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+        for root, _dirs, files in os.walk(image_dir):
+            for name in sorted(files):
+                if not name.lower().endswith(exts):
+                    continue
+                try:
+                    img = Image.open(os.path.join(root, name)).convert("RGB")
+                    inputs.append(transform(img).unsqueeze(0))
+                except Exception:
+                    continue
+                if len(inputs) >= count:
+                    return inputs
+
+    generator = torch.Generator().manual_seed(0)
+    while len(inputs) < count:
+        pixels = torch.randint(0, 256, (224, 224, 3), generator=generator, dtype=torch.uint8)
+        img = Image.fromarray(pixels.numpy())
+        inputs.append(transform(img).unsqueeze(0))
+
+    return inputs
+
+
+def parity_check(reference, candidate, inputs: Iterable[torch.Tensor]) -> Dict[str, float]:
+    """Compare ``candidate`` against ``reference`` on the same inputs.
+
+    Both arguments are backends (or any callable returning logits).
+
+    Returns:
+        dict with ``samples``, ``class_agreement`` (fraction of inputs where
+        both models pick the same class) and ``max_prob_deviation`` (largest
+        absolute softmax difference over all inputs and classes).
+    """
+
+    samples = 0
+    agree = 0
+    max_dev = 0.0
+
+    with torch.no_grad():
+        for x in inputs:
+            p_ref = F.softmax(reference(x).float(), dim=1).cpu()
+            p_cand = F.softmax(candidate(x).float(), dim=1).cpu()
+
+            samples += p_ref.size(0)
+            agree += int((p_ref.argmax(dim=1) == p_cand.argmax(dim=1)).sum().item())
+            max_dev = max(max_dev, float((p_ref - p_cand).abs().max().item()))
+
+    return {
+        "samples": samples,
+        "class_agreement": agree / samples if samples else 0.0,
+        "max_prob_deviation": max_dev,
+    }
+
+
+def median_latency_ms(backend, inputs: Iterable[torch.Tensor], warmup: int = 1) -> float:
+    """Median single-call latency of ``backend`` over ``inputs`` in milliseconds."""
+
+    inputs = list(inputs)
+    for x in inputs[:warmup]:
+        backend(x)
+    timings = []
+    for x in inputs:
+        start = time.perf_counter()
+        backend(x)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(timings) if timings else 0.0
+
+
+def verify_backend(
+    reference,
+    candidate,
+    inputs: Iterable[torch.Tensor],
+    min_agreement: float = 0.9,
+    max_deviation: float | None = None,
+) -> Tuple[bool, Dict[str, float]]:
+    """Parity guard: compare ``candidate`` with ``reference`` and time both.
+
+    Returns:
+        ``(passed, report)`` where report holds the ``parity_check`` fields plus
+        ``reference_ms`` / ``candidate_ms`` median latencies on the same inputs.
+    """
+
+    inputs = list(inputs)
+    report = parity_check(reference, candidate, inputs)
+    report["reference_ms"] = median_latency_ms(reference, inputs)
+    report["candidate_ms"] = median_latency_ms(candidate, inputs)
+
+    passed = report["class_agreement"] >= min_agreement
+    if max_deviation is not None and report["max_prob_deviation"] > max_deviation:
+        passed = False
+    return passed, report
@@ -0,0 +1,393 @@
+"""Out-of-process inference worker pool with shared-memory tensor handoff.
+
+Flask request threads hand preprocessed ``(3, 224, 224)`` tensors to a pool
+of separate worker processes, each holding its own model replica, so the
+ViT forward and the Grad-CAM backward never hold the web process's GIL.
+
+Tensors travel through a ring of fixed-size slots in one
+``multiprocessing.shared_memory`` block: the request thread copies its
+input into a free slot, the worker reads it in place (``torch.from_numpy``
+on the shared buffer, no pickling) and writes probabilities and the
+optional heatmap back into the same slot. Only the slot index and a few
+flags go over the control connection.
+
+Backpressure: when every slot is in use, ``infer`` waits at most
+``queue_timeout`` seconds for one to free up and then raises
+``PoolFullError`` so the endpoint can answer 503 instead of queueing
+without bound.
+
+Workers are started as plain subprocesses running this module
+(``python inference_pool.py --worker ...``), so they never import the
+Flask app.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+INPUT_SHAPE = (3, 224, 224)
+HEATMAP_SHAPE = (224, 224)
+MAX_CLASSES = 16
+
+
+class PoolFullError(RuntimeError):
+    """Raised when no ring slot frees up within the queue timeout."""
+
+
+class _SlotRing:
+    """NumPy views over the shared-memory slots (same layout in every process)."""
+
+    def __init__(self, buf, slots: int):
+        input_size = int(np.prod(INPUT_SHAPE))
+        heatmap_size = int(np.prod(HEATMAP_SHAPE))
+        self.slot_floats = input_size + MAX_CLASSES + heatmap_size
+        flat = np.ndarray((slots, self.slot_floats), dtype=np.float32, buffer=buf)
+
+        self.inputs = flat[:, :input_size].reshape((slots,) + INPUT_SHAPE)
+        self.probs = flat[:, input_size:input_size + MAX_CLASSES]
+        self.heatmaps = flat[:, input_size + MAX_CLASSES:].reshape((slots,) + HEATMAP_SHAPE)
+
+    @staticmethod
+    def nbytes(slots: int) -> int:
+        return slots * (int(np.prod(INPUT_SHAPE)) + MAX_CLASSES + int(np.prod(HEATMAP_SHAPE))) * 4
+
+
+def _attach_shared_memory(name: str) -> SharedMemory:
+    """Attach to the parent's block without letting this process unlink it at exit."""
+
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = SharedMemory(name=name)
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")  # pylint: disable=protected-access
+        except Exception:
+            pass
+        return shm
+
+
+class InferencePool:
+    """Pool of model-replica worker processes fed through a shared-memory ring."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        slots: Optional[int] = None,
+        model_path: str = "vit3class.pth",
+        backend: str = "eager",
+        reduced_backend: Optional[str] = None,
+        cache_dir: str = "model_cache",
+        threads_per_worker: Optional[int] = None,
+        start_timeout: float = 300.0,
+    ):
+        self.num_workers = max(1, workers)
+        self.slots = slots or 2 * self.num_workers
+        self.model_path = os.path.abspath(model_path)
+        self.backend = backend
+        self.reduced_backend = reduced_backend
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.start_timeout = start_timeout
+
+        self._shm: Optional[SharedMemory] = None
+        self._ring: Optional[_SlotRing] = None
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._listener: Optional[Listener] = None
+        self._authkey = secrets.token_bytes(16)
+        self._procs = []
+        self._threads = []
+        self._closed = False
+        self.backend_name = backend
+        self.reduced_backend_name: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> "InferencePool":
+        self._shm = SharedMemory(create=True, size=_SlotRing.nbytes(self.slots))
+        self._ring = _SlotRing(self._shm.buf, self.slots)
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+
+        self._listener = Listener(("127.0.0.1", 0), authkey=self._authkey)
+
+        for i in range(self.num_workers):
+            self._spawn_worker(i)
+
+        print(
+            f"[POOL] {self.num_workers} inference worker(s) ready, {self.slots} ring slots, "
+            f"{self.threads_per_worker} thread(s) each"
+        )
+        return self
+
+    def _spawn_worker(self, index: int) -> None:
+        cmd = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--worker",
+            "--address", "%s:%d" % self._listener.address,
+            "--shm", self._shm.name,
+            "--slots", str(self.slots),
+            "--model", self.model_path,
+            "--backend", self.backend,
+            "--cache-dir", self.cache_dir,
+            "--threads", str(self.threads_per_worker),
+        ]
+        if self.reduced_backend:
+            cmd += ["--reduced-backend", self.reduced_backend]
+        # The authkey guards a pickle channel, so it goes through stdin: argv
+        # is readable by every local user via ps / /proc/<pid>/cmdline
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        proc.stdin.write(self._authkey.hex().encode("ascii") + b"\n")
+        proc.stdin.close()
+        conn = self._accept(proc)
+        _status, _pid, backend_name, reduced_name = conn.recv()
+        self.backend_name = backend_name
+        self.reduced_backend_name = reduced_name
+
+        if index < len(self._procs):
+            self._procs[index] = proc
+        else:
+            self._procs.append(proc)
+
+        thread = threading.Thread(target=self._dispatch, args=(index, conn), name=f"pool-dispatch-{index}", daemon=True)
+        thread.start()
+        if index < len(self._threads):
+            self._threads[index] = thread
+        else:
+            self._threads.append(thread)
+
+    def _accept(self, proc):
+        """Accept the new worker's connection, failing fast if it dies while loading."""
+
+        accepted = {}
+        thread = threading.Thread(
+            target=lambda: accepted.setdefault("conn", self._listener.accept()),
+            daemon=True,
+        )
+        thread.start()
+
+        waited = 0.0
+        while thread.is_alive():
+            thread.join(0.2)
+            waited += 0.2
+            if proc.poll() is not None:
+                raise RuntimeError(f"Inference worker exited during startup ({proc.returncode})")
+            if waited > self.start_timeout:
+                proc.kill()
+                raise RuntimeError("Inference worker did not start in time")
+        return accepted["conn"]
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._jobs.put(None)
+        for proc in self._procs:
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if self._listener is not None:
+            self._listener.close()
+        if self._shm is not None:
+            self._ring = None
+            self._shm.close()
+            self._shm.unlink()
+
+    # ------------------------------------------------------------------
+    # Request side
+    # ------------------------------------------------------------------
+    def infer(
+        self,
+        tensor,
+        heatmap=False,
+        target_index: Optional[int] = None,
+        reduced: bool = False,
+        queue_timeout: float = 0.5,
+        timeout: float = 120.0,
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Run one preprocessed image through a worker.
+
+        Args:
+            tensor: (3, 224, 224) or (1, 3, 224, 224) float tensor / array
+            heatmap: also compute a heatmap: True / ``"gradcam"`` for Grad-CAM
+                (for ``target_index`` or the predicted class when None),
+                ``"rollout"`` for a forward-only attention rollout
+            reduced: run the forward on the workers' reduced-precision backend
+                (when ``reduced_backend_name`` is set; heatmaps always use fp32)
+            queue_timeout: how long to wait for a free ring slot
+            timeout: how long to wait for the worker's answer
+
+        Returns:
+            ``(probs, heatmap)`` as NumPy arrays; heatmap is None unless requested.
+
+        Raises:
+            PoolFullError: no slot became free within ``queue_timeout``.
+        """
+
+        try:
+            slot = self._free_slots.get(timeout=queue_timeout)
+        except queue.Empty:
+            raise PoolFullError("Inference queue is full") from None
+
+        try:
+            array = tensor.detach().cpu().numpy() if hasattr(tensor, "detach") else np.asarray(tensor)
+            np.copyto(self._ring.inputs[slot], array.reshape(INPUT_SHAPE), casting="same_kind")
+        except Exception:
+            self._free_slots.put(slot)
+            raise
+
+        if heatmap is True:
+            heatmap = "gradcam"
+
+        future: Future = Future()
+        # The dispatcher owns the slot from here on and frees it once the
+        # outputs have been copied out, even if this caller times out.
+        self._jobs.put((slot, heatmap, target_index, reduced, future))
+        return future.result(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.num_workers,
+            "slots": self.slots,
+            "free_slots": self._free_slots.qsize(),
+            "queued": self._jobs.qsize(),
+        }
+
+    # ------------------------------------------------------------------
+    # Dispatcher (one thread per worker connection)
+    # ------------------------------------------------------------------
+    def _dispatch(self, index: int, conn) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                try:
+                    conn.send(None)
+                except (OSError, EOFError):
+                    pass
+                return
+
+            slot, want_heatmap, target_index, reduced, future = job
+            try:
+                conn.send((slot, want_heatmap, target_index, reduced))
+                status, payload = conn.recv()
+            except (OSError, EOFError) as e:
+                self._free_slots.put(slot)
+                future.set_exception(RuntimeError(f"Inference worker {index} died: {e}"))
+                if not self._closed:
+                    print(f"[POOL] Worker {index} died, restarting")
+                    self._spawn_worker(index)
+                return
+
+            if status == "ok":
+                num_classes = payload
+                probs = self._ring.probs[slot, :num_classes].copy()
+                heat = self._ring.heatmaps[slot].copy() if want_heatmap else None
+                self._free_slots.put(slot)
+                future.set_result((probs, heat))
+            else:
+                self._free_slots.put(slot)
+                future.set_exception(RuntimeError(payload))
+
+
+# ----------------------------------------------------------------------
+# Worker process
+# ----------------------------------------------------------------------
+def _worker_main(args) -> None:
+    import torch
+    import torch.nn.functional as F
+
+    torch.set_num_threads(args.threads)
+
+    from model_loader import load_model
+    from inference_backends import create_backend
+    from gradcam_vit import generate_vit_gradcam_from_tensor
+    from attention_rollout import attention_rollout_from_tensor
+
+    model = load_model(args.model, "cpu")
+    backend = create_backend(args.backend, model, "cpu", args.model, cache_dir=args.cache_dir)
+    # The parent only passes a reduced-precision backend that passed its parity guard
+    reduced_backend = None
+    if args.reduced_backend:
+        candidate = create_backend(args.reduced_backend, model, "cpu", args.model, cache_dir=args.cache_dir)
+        if candidate.name == args.reduced_backend:
+            reduced_backend = candidate
+
+    host, port = args.address.rsplit(":", 1)
+    conn = Client((host, int(port)), authkey=args.authkey)
+    shm = _attach_shared_memory(args.shm)
+    ring = _SlotRing(shm.buf, args.slots)
+
+    conn.send(("ready", os.getpid(), backend.name, reduced_backend.name if reduced_backend else None))
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+
+        slot, want_heatmap, target_index, reduced = msg
+        try:
+            # Zero-copy view of the request's input in shared memory
+            x = torch.from_numpy(ring.inputs[slot]).unsqueeze(0)
+
+            if want_heatmap == "rollout":
+                heatmap, logits = attention_rollout_from_tensor(model, x)
+                ring.heatmaps[slot] = heatmap
+            elif want_heatmap:
+                heatmap, logits = generate_vit_gradcam_from_tensor(model, x, target_index)
+                ring.heatmaps[slot] = heatmap
+            elif reduced and reduced_backend is not None:
+                logits = reduced_backend(x)
+            else:
+                logits = backend(x)
+
+            probs = F.softmax(logits.float(), dim=1)[0].cpu().numpy()
+            ring.probs[slot, :probs.shape[0]] = probs
+            conn.send(("ok", int(probs.shape[0])))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    del ring
+    shm.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inference pool worker process")
+    parser.add_argument("--worker", action="store_true", required=True)
+    parser.add_argument("--address", required=True)
+    parser.add_argument("--shm", required=True)
+    parser.add_argument("--slots", type=int, required=True)
+    parser.add_argument("--model", default="vit3class.pth")
+    parser.add_argument("--backend", default="eager")
+    parser.add_argument("--reduced-backend", default=None)
+    parser.add_argument("--cache-dir", default="model_cache")
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args(argv)
+    # Sent by the parent on stdin (never on the command line)
+    args.authkey = bytes.fromhex(sys.stdin.readline().strip())
+    _worker_main(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
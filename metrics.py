@@ -0,0 +1,232 @@
+"""In-process metrics exported in the Prometheus text format.
+
+Request handlers and ``VideoProcessor`` record stage latencies into
+histograms and count events (ensemble sources, errors) with counters; the
+``/metrics`` endpoint renders everything with ``REGISTRY.render()``.
+
+Recording is meant for the hot path: an observation is one bisect over
+the bucket bounds and a few additions under a per-metric lock (about a
+microsecond), and nothing is formatted until a scrape. Values that other
+components already track (admission queues, the degradation level,
+heatmap cache hits) are read through callbacks at scrape time instead of
+being duplicated.
+
+Metrics are per process: under ``serve_prefork.py`` each worker keeps its
+own and ``/metrics`` reports the worker that answers the scrape, tagged
+with its ``pid`` in ``deepfake_process_info``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+# Seconds; covers everything from a cached lookup to a slow external API call
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Timer:
+    """Context manager that observes the elapsed time into a histogram."""
+
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: "Histogram", labels: Tuple[str, ...]):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._histogram.observe(time.perf_counter() - self._start, *self._labels)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *labels: str) -> _Timer:
+        """``with histogram.time("predict", "decode"): ...``"""
+
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        lines = []
+        for labels, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter with one series per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = dict(self._values)
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in sorted(snapshot.items())]
+
+
+class Callback:
+    """Gauge or counter whose samples are read from ``fn()`` at scrape time.
+
+    ``fn`` returns an iterable of ``(label values, value)`` pairs.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str],
+                 fn: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in self.fn()]
+
+
+class Registry:
+    """Named metrics rendered together in the text exposition format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def callback(self, name: str, documentation: str, fn, labelnames: Sequence[str] = (),
+                 kind: str = "gauge") -> Callback:
+        return self._register(Callback(name, documentation, kind, labelnames, fn))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.render()
+            except Exception as e:
+                # A failing callback must not break the whole scrape
+                print(f"[METRICS] Could not collect {metric.name}: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Latency of each stage of a request; endpoint is the Flask endpoint or
+# "heatmap" for lazily rendered overlays
+STAGE_SECONDS = REGISTRY.histogram(
+    "deepfake_stage_seconds", "Time spent in each request stage.", ("endpoint", "stage"))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "deepfake_request_seconds", "End-to-end request handling time.", ("endpoint", "status"))
+EXTERNAL_API_SECONDS = REGISTRY.histogram(
+    "deepfake_external_api_seconds", "Latency of calls to external APIs.", ("provider", "outcome"))
+VIDEO_STAGE_SECONDS = REGISTRY.histogram(
+    "deepfake_video_stage_seconds", "Time spent in each VideoProcessor stage.", ("stage",))
+ENSEMBLE_SOURCE_TOTAL = REGISTRY.counter(
+    "deepfake_ensemble_source_total", "Predictions by ensemble source.", ("source",))
+ERRORS_TOTAL = REGISTRY.counter(
+    "deepfake_errors_total", "Errors by endpoint and kind.", ("endpoint", "kind"))
+
+_START_TIME = time.time()
+REGISTRY.callback(
+    "deepfake_process_info", "Process answering this scrape (always 1).",
+    lambda: [((str(os.getpid()),), 1)], ("pid",))
+REGISTRY.callback(
+    "deepfake_process_start_time_seconds", "Start time of the process since the epoch.",
+    lambda: [((), _START_TIME)])
+
+
+def observe_external(provider: str, start: float, outcome: str) -> float:
+    """Record an external API call that started at ``start`` (``time.perf_counter()``); return its duration."""
+
+    elapsed = time.perf_counter() - start
+    EXTERNAL_API_SECONDS.observe(elapsed, provider, outcome)
+    return elapsed
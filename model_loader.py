@@ -0,0 +1,183 @@
+"""Model construction and preprocessing shared by the app and offline tools.
+
+Keeps the ViT-B/16 architecture, checkpoint loading, class mapping and
+input transform in one place so the Flask app, benchmarks and diagnostic
+scripts all run exactly the same model path.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import os
+
+import torch
+from torchvision import transforms, models
+
+
+MODEL_PATH = "vit3class.pth"
+
+# Class names
+CLASS_NAMES = {0: "AI-Generated Face", 1: "Deepfake", 2: "Real"}
+
+
+def build_transform():
+    """Image / frame transform.
+
+    MUST match training preprocessing exactly!
+    Training used [0.5, 0.5, 0.5] normalization
+    """
+
+    return transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.5, 0.5, 0.5], [0.5, 0.5, 0.5])
+    ])
+
+
+def tensor_to_uint8(tensor: torch.Tensor):
+    """Invert ``build_transform``'s ToTensor + Normalize.
+
+    Returns the resized image as an (H, W, 3) uint8 array. Since the tensor
+    was produced from a uint8 image, this is lossless and takes a quarter of
+    the memory of the float tensor.
+    """
+
+    x = tensor.detach().float().cpu()
+    if x.ndim == 4:
+        x = x[0]
+    x = (x * 0.5 + 0.5).clamp(0.0, 1.0).mul(255.0).round().to(torch.uint8)
+    return x.permute(1, 2, 0).contiguous().numpy()
+
+
+def uint8_to_tensor(array) -> torch.Tensor:
+    """Rebuild the normalized ``(1, 3, H, W)`` input tensor from ``tensor_to_uint8`` output."""
+
+    x = torch.from_numpy(array).permute(2, 0, 1).float().div(255.0)
+    return ((x - 0.5) / 0.5).unsqueeze(0)
+
+
+def _build_vit(empty: bool = True) -> torch.nn.Module:
+    """Build the 3-class ViT-B/16 architecture without pretrained weights.
+
+    The ImageNet weights are overwritten by the checkpoint anyway, so they are
+    never downloaded or read. With ``empty=True`` parameters are created on the
+    ``meta`` device, which also skips the random initialization.
+    """
+
+    if empty:
+        with torch.device("meta"):
+            model = models.vit_b_16(weights=None)
+            model.heads.head = torch.nn.Linear(768, 3)
+        return model
+
+    model = models.vit_b_16(weights=None)
+    model.heads.head = torch.nn.Linear(768, 3)
+    return model
+
+
+def random_model(device: torch.device | str = "cpu", seed: int = 0) -> torch.nn.Module:
+    """The 3-class ViT-B/16 with seeded random weights, for benchmarks run without the checkpoint."""
+
+    torch.manual_seed(seed)
+    return _build_vit(empty=False).to(device).eval()
+
+
+def _load_state_dict(model_path: str):
+    """Load the checkpoint memory-mapped when this torch supports it."""
+
+    try:
+        return torch.load(model_path, map_location="cpu", mmap=True, weights_only=True), True
+    except (TypeError, RuntimeError):
+        # torch < 2.1 (no mmap) or a legacy non-zipfile checkpoint
+        return torch.load(model_path, map_location="cpu"), False
+
+
+_SUPPORTS_ASSIGN = "assign" in inspect.signature(torch.nn.Module.load_state_dict).parameters
+
+
+def load_model(
+    model_path: str = MODEL_PATH,
+    device: torch.device | str = "cpu",
+    ready_cache_dir: str | None = None,
+) -> torch.nn.Module:
+    """Build the 3-class ViT-B/16 and load the fine-tuned weights.
+
+    The checkpoint is memory-mapped and assigned directly to an empty model,
+    so weights are neither initialized nor copied. When ``ready_cache_dir`` is
+    given, the ready model is pickled there once and later startups load it in
+    one step.
+    """
+
+    if ready_cache_dir:
+        model = _load_ready_model(model_path, ready_cache_dir)
+        if model is not None:
+            return model.to(device).eval()
+
+    state, mmapped = _load_state_dict(model_path)
+
+    if _SUPPORTS_ASSIGN:
+        model = _build_vit(empty=True)
+        model.load_state_dict(state, assign=True)
+    else:
+        model = _build_vit(empty=False)
+        model.load_state_dict(state)
+
+    print(f"[MODEL] Loaded {model_path} ({'memory-mapped' if mmapped else 'copied'})")
+
+    if ready_cache_dir:
+        _save_ready_model(model, model_path, ready_cache_dir)
+
+    model.to(device)
+    model.eval()
+
+    return model
+
+
+def _ready_model_path(model_path: str, cache_dir: str) -> str:
+    # Cheap stamp (size + mtime) instead of a content hash: hashing the whole
+    # checkpoint would cost more than the load this cache saves.
+    stat = os.stat(model_path)
+    stamp = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}:{torch.__version__}".encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"vit3class_ready_{stamp}.pt")
+
+
+def _load_ready_model(model_path: str, cache_dir: str) -> torch.nn.Module | None:
+    cache_path = _ready_model_path(model_path, cache_dir)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        try:
+            model = torch.load(cache_path, map_location="cpu", mmap=True, weights_only=False)
+        except TypeError:
+            model = torch.load(cache_path, map_location="cpu")
+        print(f"[MODEL] Loaded ready model cache: {cache_path}")
+        return model
+    except Exception as e:
+        print(f"[MODEL] Failed to load ready model cache ({e}), rebuilding")
+        return None
+
+
+def _save_ready_model(model: torch.nn.Module, model_path: str, cache_dir: str) -> None:
+    cache_path = _ready_model_path(model_path, cache_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            if name.startswith("vit3class_ready_") and os.path.join(cache_dir, name) != cache_path:
+                os.remove(os.path.join(cache_dir, name))
+        tmp_path = cache_path + ".tmp"
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, cache_path)
+        print(f"[MODEL] Cached ready model: {cache_path}")
+    except Exception as e:
+        print(f"[MODEL] Could not cache ready model: {e}")
+
+
+def checkpoint_fingerprint(checkpoint_path: str = MODEL_PATH, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a checkpoint file."""
+
+    digest = hashlib.sha256()
+    with open(checkpoint_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,178 @@
+"""Opt-in ``torch.profiler`` capture of live requests.
+
+A request is profiled when it carries the admin token in ``X-Profile`` or
+is picked by the sampling rate. The whole handler runs under
+``torch.profiler.profile`` (the forward pass, Grad-CAM and every other
+torch op), and the app labels its stages with ``region()`` so they show up
+as named ranges in the trace. Only one request is profiled at a time (the
+profiler is process-wide); selected requests that arrive while another
+one is being profiled run normally.
+
+When the profiler stops, a background thread writes the Chrome trace
+(open in chrome://tracing or https://ui.perfetto.dev) to ``output_dir``,
+deleting the oldest traces beyond ``max_traces``, and keeps an
+operator-level summary (top ops by self CPU time) for the admin endpoint.
+
+The app only creates a ``RequestProfiler`` when profiling is configured,
+so with it disabled no profiling code runs at all.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import glob
+import hmac
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+
+class _Capture:
+    __slots__ = ("profile", "name", "request_id", "endpoint", "started_at", "start")
+
+    def __init__(self, profile, name: str, request_id: str, endpoint: str):
+        self.profile = profile
+        self.name = name
+        self.request_id = request_id
+        self.endpoint = endpoint
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.start = time.perf_counter()
+
+
+class RequestProfiler:
+    """Captures torch.profiler traces for selected requests into a bounded directory."""
+
+    def __init__(
+        self,
+        output_dir: str = "profiles",
+        sample_rate: float = 0.0,
+        admin_token: Optional[str] = None,
+        max_traces: int = 20,
+        keep_summaries: int = 20,
+        top_ops: int = 25,
+        record_shapes: bool = False,
+    ):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self.max_traces = max(1, max_traces)
+        self.top_ops = top_ops
+        self.record_shapes = record_shapes
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._summaries: Deque[dict] = deque(maxlen=max(1, keep_summaries))
+        self._captured = 0
+        self._skipped_busy = 0
+
+    def is_admin(self, token: Optional[str]) -> bool:
+        return bool(self.admin_token and token and hmac.compare_digest(token, self.admin_token))
+
+    def selected(self, header_token: Optional[str]) -> bool:
+        """Whether to profile a request: admin header, else the sampling rate."""
+
+        return self.is_admin(header_token) or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start(self, request_id: str, endpoint: str) -> Optional[str]:
+        """Start profiling the current thread's request; return the trace name (None if busy)."""
+
+        if not self._busy.acquire(blocking=False):
+            with self._lock:
+                self._skipped_busy += 1
+            return None
+        try:
+            from torch.profiler import ProfilerActivity, profile
+            import torch
+
+            activities = [ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(ProfilerActivity.CUDA)
+            prof = profile(activities=activities, record_shapes=self.record_shapes)
+            prof.__enter__()
+        except Exception as e:
+            self._busy.release()
+            print(f"[PROFILE] Could not start the profiler: {e}")
+            return None
+
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{endpoint}_{request_id[:32]}"
+        self._local.capture = _Capture(prof, name, request_id, endpoint)
+        return name
+
+    def stop(self) -> None:
+        """Stop the current thread's capture (no-op if there is none) and export it in the background."""
+
+        capture = getattr(self._local, "capture", None)
+        if capture is None:
+            return
+        self._local.capture = None
+        try:
+            capture.profile.__exit__(None, None, None)
+        finally:
+            self._busy.release()
+        duration_ms = (time.perf_counter() - capture.start) * 1000.0
+        threading.Thread(target=self._export, args=(capture, duration_ms), name="profile-export", daemon=True).start()
+
+    def region(self, name: str):
+        """Named range in the trace while this thread's request is being profiled."""
+
+        if getattr(self._local, "capture", None) is None:
+            return contextlib.nullcontext()
+        from torch.profiler import record_function
+
+        return record_function(name)
+
+    def _export(self, capture: _Capture, duration_ms: float) -> None:
+        path = os.path.join(self.output_dir, capture.name + ".json")
+        try:
+            capture.profile.export_chrome_trace(path)
+            events = sorted(capture.profile.key_averages(), key=lambda e: e.self_cpu_time_total, reverse=True)
+            ops = [
+                {
+                    "op": e.key,
+                    "calls": e.count,
+                    "self_cpu_ms": round(e.self_cpu_time_total / 1000.0, 3),
+                    "cpu_total_ms": round(e.cpu_time_total / 1000.0, 3),
+                }
+                for e in events[:self.top_ops]
+            ]
+        except Exception as e:
+            print(f"[PROFILE] Could not export {capture.name}: {e}")
+            return
+
+        with self._lock:
+            self._captured += 1
+            self._summaries.append({
+                "trace": os.path.basename(path),
+                "request_id": capture.request_id,
+                "endpoint": capture.endpoint,
+                "started_at": capture.started_at,
+                "duration_ms": round(duration_ms, 2),
+                "top_ops": ops,
+            })
+            traces = sorted(glob.glob(os.path.join(self.output_dir, "*.json")), key=os.path.getmtime)
+            for old in traces[:-self.max_traces]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        print(f"[PROFILE] Wrote {path} ({duration_ms:.0f} ms request)")
+
+    def traces(self) -> List[str]:
+        return sorted(os.path.basename(p) for p in glob.glob(os.path.join(self.output_dir, "*.json")))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "output_dir": self.output_dir,
+                "sample_rate": self.sample_rate,
+                "header_trigger": bool(self.admin_token),
+                "captured_total": self._captured,
+                "skipped_busy": self._skipped_busy,
+                "traces": self.traces(),
+                "summaries": list(self._summaries),
+            }
@@ -0,0 +1,75 @@
+"""Dynamic INT8 quantization utilities for Vision Transformer (ViT-B-16).
+
+This module builds a dynamically quantized copy of the fp32 model (INT8
+weights for every ``nn.Linear`` in the encoder MLPs and the classification
+head) and caches it on disk so startup does not redo the conversion.
+Parity against the fp32 reference is checked by ``inference_backends``.
+
+The quantized model is CPU-only and does not support autograd through its
+quantized layers, so Grad-CAM must keep using the fp32 model.
+"""
+
+from __future__ import annotations
+
+import copy
+import glob
+import os
+
+import torch
+
+from model_loader import checkpoint_fingerprint
+
+
+def quantize_vit_dynamic(model: torch.nn.Module) -> torch.nn.Module:
+    """Return a dynamically INT8-quantized CPU copy of ``model``.
+
+    The original model is left untouched (it is still needed for Grad-CAM).
+    """
+
+    fp32_copy = copy.deepcopy(model).cpu().eval()
+    quantized = torch.ao.quantization.quantize_dynamic(
+        fp32_copy,
+        {torch.nn.Linear},
+        dtype=torch.qint8,
+    )
+    return quantized.eval()
+
+
+def load_or_quantize_vit(
+    model: torch.nn.Module,
+    checkpoint_path: str,
+    cache_dir: str = "model_cache",
+) -> torch.nn.Module:
+    """Load the cached INT8 model for ``checkpoint_path`` or build and cache it.
+
+    The cache file name contains the checkpoint fingerprint, so retrained
+    weights never pick up a stale quantized model.
+    """
+
+    fingerprint = checkpoint_fingerprint(checkpoint_path)[:16]
+    cache_path = os.path.join(cache_dir, f"vit3class_int8_{fingerprint}.pt")
+
+    if os.path.exists(cache_path):
+        try:
+            quantized = torch.load(cache_path, map_location="cpu", weights_only=False)
+            print(f"[QUANT] Loaded cached INT8 model: {cache_path}")
+            return quantized.eval()
+        except Exception as e:
+            print(f"[QUANT] Failed to load cached INT8 model ({e}), rebuilding")
+
+    quantized = quantize_vit_dynamic(model)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Drop caches built from older checkpoints
+        for stale in glob.glob(os.path.join(cache_dir, "vit3class_int8_*.pt")):
+            if stale != cache_path:
+                os.remove(stale)
+        tmp_path = cache_path + ".tmp"
+        torch.save(quantized, tmp_path)
+        os.replace(tmp_path, cache_path)
+        print(f"[QUANT] Cached INT8 model: {cache_path}")
+    except Exception as e:
+        print(f"[QUANT] Could not cache INT8 model: {e}")
+
+    return quantized
@@ -0,0 +1,330 @@
+"""Concurrent reverse image search across several providers.
+
+``ReverseSearchFanout.search`` starts every provider query at once on a
+shared thread pool and waits under one global deadline:
+
+    first  return the first provider with a usable (non-empty) result set
+           and cancel the rest
+    merge  wait for every provider (or the deadline) and return all
+           results, deduplicated by link in provider order
+
+A provider is a callable ``fn(ctx)`` returning a list of
+``{'title', 'link'}`` dicts. It should size its HTTP timeouts with
+``ctx.timeout(cap)`` and check ``ctx.cancelled`` before each further
+call: an HTTP request already in flight cannot be interrupted, so
+"cancelled" means the response is no longer waited for, queued providers
+never start, and running ones stop before their next call.
+
+Steps that several providers depend on (the public image upload) go
+through ``SharedCall``, which runs on the thread of the first provider
+that needs it rather than on the pool.
+
+Per-provider calls, usable results, errors, wins (first usable result of
+a search) and latency are kept in ``stats()``.
+
+The response parsers for SerpAPI and RapidAPI and the tmpfiles.org
+direct-link rewrite live here too, shared by the app's provider calls.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+SEARCH_MODES = ("first", "merge")
+
+Links = List[Dict[str, str]]
+
+
+class DeadlineExceeded(Exception):
+    """The search deadline passed (or the search was cancelled) before a provider call."""
+
+
+class SearchContext:
+    """Deadline and cancellation shared by the providers of one search."""
+
+    def __init__(self, deadline_s: float):
+        self.deadline = time.monotonic() + deadline_s
+        self.cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def timeout(self, cap: float) -> float:
+        """Timeout for the next call: at most ``cap``, never past the deadline."""
+
+        remaining = self.remaining()
+        if remaining <= 0 or self.cancelled.is_set():
+            raise DeadlineExceeded()
+        return min(cap, remaining)
+
+
+class SharedCall:
+    """A step several providers of one search need (e.g. uploading the image), run at most once.
+
+    The first provider to call ``get`` runs ``fn(ctx)`` on its own thread;
+    later callers wait for that result within the search deadline. Nothing
+    runs on the fan-out pool, so a waiting provider never holds a pool
+    thread that the step itself would need.
+    """
+
+    def __init__(self, fn: Callable[[SearchContext], Any]):
+        self._fn = fn
+        self._lock = threading.Lock()
+        self._started = False
+        self._done = threading.Event()
+        self._value: Any = None
+        self._error: Optional[BaseException] = None
+
+    def get(self, ctx: SearchContext) -> Any:
+        with self._lock:
+            run = not self._started
+            self._started = True
+        if run:
+            try:
+                self._value = self._fn(ctx)
+            except BaseException as e:
+                self._error = e
+                raise
+            finally:
+                self._done.set()
+        else:
+            # Short waits so a cancelled search releases its waiting providers promptly
+            while not self._done.wait(ctx.timeout(0.1)):
+                pass
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def done(self) -> bool:
+        return self._done.is_set() and self._error is None
+
+    def value(self) -> Any:
+        """Result if the call has finished successfully, else None (never waits)."""
+
+        return self._value if self.done() else None
+
+
+class _ProviderStats:
+    __slots__ = ("calls", "usable", "errors", "wins", "latency_total", "latencies")
+
+    def __init__(self):
+        self.calls = 0
+        self.usable = 0
+        self.errors = 0
+        self.wins = 0
+        self.latency_total = 0.0
+        self.latencies: List[float] = []
+
+    def as_dict(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "usable": self.usable,
+            "errors": self.errors,
+            "wins": self.wins,
+            "win_rate": round(self.wins / self.calls, 3) if self.calls else 0.0,
+            "mean_latency_s": round(self.latency_total / self.calls, 3) if self.calls else 0.0,
+            "p95_latency_s": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3)
+            if latencies else 0.0,
+        }
+
+
+class ReverseSearchFanout:
+    """Runs provider queries concurrently under a global deadline."""
+
+    def __init__(self, max_workers: int = 16, deadline_s: float = 20.0, mode: str = "first",
+                 latency_window: int = 500):
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {SEARCH_MODES}, got '{mode}'")
+        self.deadline_s = deadline_s
+        self.mode = mode
+        self.latency_window = latency_window
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="reverse-search")
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _ProviderStats] = {}
+        self._searches = 0
+        self._no_result = 0
+
+    def context(self, deadline_s: Optional[float] = None) -> SearchContext:
+        return SearchContext(self.deadline_s if deadline_s is None else deadline_s)
+
+    def search(
+        self,
+        providers: Sequence[Tuple[str, Callable[[SearchContext], Links]]],
+        ctx: SearchContext,
+        mode: Optional[str] = None,
+    ) -> dict:
+        """Query ``providers`` (in priority order) concurrently.
+
+        Returns:
+            dict with ``results`` (list of links), ``engines`` (providers the
+            results came from), ``winner`` (first provider with usable
+            results, or None) and per-provider ``providers`` status:
+            ok / empty / error / timeout / cancelled, latency and count.
+        """
+
+        mode = mode or self.mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {SEARCH_MODES}, got '{mode}'")
+        order = [name for name, _ in providers]
+        futures = {self._executor.submit(self._run, name, fn, ctx): name for name, fn in providers}
+        outcomes: Dict[str, dict] = {}
+        winner = None
+
+        pending = set(futures)
+        while pending:
+            remaining = ctx.remaining()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            # Several may finish together: the earlier provider in ``providers`` wins
+            for future in sorted(done, key=lambda f: order.index(futures[f])):
+                name = futures[future]
+                outcomes[name] = future.result()
+                if winner is None and outcomes[name]["links"]:
+                    winner = name
+            if mode == "first" and winner is not None:
+                break
+
+        # Stop everything still running: queued providers never start and
+        # running ones give up before their next HTTP call
+        ctx.cancelled.set()
+        for future in pending:
+            name = futures[future]
+            status = "cancelled" if future.cancel() or winner is not None else "timeout"
+            outcomes[name] = {"status": status, "links": [], "latency_s": None, "error": None}
+
+        with self._lock:
+            self._searches += 1
+            if winner is None:
+                self._no_result += 1
+            else:
+                self._stats[winner].wins += 1
+
+        if mode == "first":
+            engines = [winner] if winner else []
+            results = list(outcomes[winner]["links"]) if winner else []
+        else:
+            engines, results, seen = [], [], set()
+            for name in order:
+                links = outcomes[name]["links"]
+                if links:
+                    engines.append(name)
+                for link in links:
+                    if link["link"] not in seen:
+                        seen.add(link["link"])
+                        results.append(link)
+
+        return {
+            "mode": mode,
+            "winner": winner,
+            "engines": engines,
+            "results": results,
+            "providers": {
+                name: {
+                    "status": outcomes[name]["status"],
+                    "latency_ms": round(outcomes[name]["latency_s"] * 1000.0, 1)
+                    if outcomes[name]["latency_s"] is not None else None,
+                    "count": len(outcomes[name]["links"]),
+                    "error": outcomes[name]["error"],
+                }
+                for name in order
+            },
+        }
+
+    def _run(self, name: str, fn: Callable[[SearchContext], Links], ctx: SearchContext) -> dict:
+        start = time.perf_counter()
+        links, error, status = [], None, "empty"
+        try:
+            links = fn(ctx) or []
+            status = "ok" if links else "empty"
+        except DeadlineExceeded:
+            status = "cancelled" if ctx.cancelled.is_set() else "timeout"
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+            print(f"[REVERSE_SEARCH] {name} failed: {error}")
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            stats = self._stats.setdefault(name, _ProviderStats())
+            stats.calls += 1
+            stats.usable += bool(links)
+            stats.errors += status == "error"
+            stats.latency_total += latency
+            stats.latencies.append(latency)
+            if len(stats.latencies) > self.latency_window:
+                del stats.latencies[0]
+        return {"status": status, "links": links, "latency_s": latency, "error": error}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "deadline_s": self.deadline_s,
+                "searches": self._searches,
+                "no_result": self._no_result,
+                "providers": {name: s.as_dict() for name, s in self._stats.items()},
+            }
+
+
+# ----------------------------------------------------------------------
+# Provider response helpers
+# ----------------------------------------------------------------------
+def _add_link(links: Links, seen: set, title: str, link: str) -> None:
+    if link and link not in seen:
+        seen.add(link)
+        links.append({"title": title or link, "link": link})
+
+
+def serpapi_links(data: dict, limit: int = 10) -> Links:
+    """Links from a SerpAPI Google reverse image response (all known result sections)."""
+
+    links: Links = []
+    seen: set = set()
+    for key in ("inline_images", "related_images", "image_results", "visual_matches", "images_results"):
+        section = data.get(key, [])
+        if not isinstance(section, list):
+            continue
+        for item in section[:10]:
+            if not isinstance(item, dict):
+                continue
+            title = (item.get("title") or item.get("name") or item.get("source")
+                     or item.get("thumbnail_title") or "")
+            link = (item.get("link") or item.get("url") or item.get("source_url")
+                    or item.get("original") or item.get("source_page_link") or "")
+            _add_link(links, seen, title, link)
+
+    # Regular search results (pages where the image appears)
+    for result in (data.get("organic_results") or [])[:10]:
+        if isinstance(result, dict):
+            _add_link(links, seen, result.get("title", ""), result.get("link", ""))
+    return links[:limit]
+
+
+def rapidapi_links(data: Any, limit: int = 5) -> Links:
+    """Links from a RapidAPI reverse-image-search1 response (a list, or a list under "data")."""
+
+    raw = data.get("data") if isinstance(data, dict) else data
+    links: Links = []
+    seen: set = set()
+    for item in (raw if isinstance(raw, list) else [])[:limit]:
+        if not isinstance(item, dict):
+            continue
+        title = item.get("title") or item.get("name") or item.get("page_title") or item.get("text") or ""
+        link = item.get("url") or item.get("link") or item.get("page_url") or item.get("href") or ""
+        _add_link(links, seen, title, link)
+    return links
+
+
+def tmpfiles_direct_url(url: str) -> str:
+    """tmpfiles.org page URL -> direct download URL (http://tmpfiles.org/1/a.jpg -> https://tmpfiles.org/dl/1/a.jpg)."""
+
+    if "tmpfiles.org" in url and "/dl/" not in url:
+        parts = url.replace("http://", "").replace("https://", "").split("/")
+        if len(parts) >= 3:
+            return f"https://tmpfiles.org/dl/{'/'.join(parts[1:])}"
+    return url
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""
+Pre-fork production server for the Flask app.
+
+The master process imports ``app`` (loading the model once), binds the
+listening socket and forks N workers that all accept on that socket. The
+workers inherit the model weights copy-on-write: nothing writes to the
+parameter storages during inference, so their pages stay shared (and when
+the checkpoint is memory-mapped they are shared page-cache pages anyway).
+``--share-memory`` additionally moves the weights into POSIX shared memory.
+
+Each worker gets ``cpus // workers`` intra-op threads so the workers do not
+oversubscribe the cores. Admission limits are per worker too: their
+defaults (e.g. PREDICT_MAX_CONCURRENT = cpus) are divided by the number of
+workers, while explicitly set limits apply to each worker. The master restarts workers that die and forwards
+SIGTERM / SIGINT to them.
+
+Threads do not survive ``fork``, so the master starts none: with
+``SERVE_PREFORK=1`` the app skips its background services (such as the
+heatmap janitor) at import and each worker starts its own after the fork.
+
+Linux / macOS only (requires ``os.fork``).
+
+Usage:
+    python serve_prefork.py --workers 4 --port 5000
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def memory_report(master_pid):
+    """Per-process memory breakdown (from /proc/<pid>/smaps_rollup) in MiB.
+
+    ``pss`` counts shared pages proportionally, so if the weights are shared
+    the workers' PSS stays far below their RSS and the total PSS is roughly
+    one copy of the weights plus per-worker overhead.
+    """
+
+    def read_rollup(pid):
+        fields = {}
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                        fields[parts[0][:-1]] = int(parts[1]) / 1024.0
+        except OSError:
+            return None
+        return {
+            "rss": fields.get("Rss", 0.0),
+            "pss": fields.get("Pss", 0.0),
+            "shared": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+            "private": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        }
+
+    def children(pid):
+        try:
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                return [int(p) for p in f.read().split()]
+        except OSError:
+            return []
+
+    report = {}
+    for role, pids in (("master", [master_pid]), ("worker", children(master_pid))):
+        for pid in pids:
+            stats = read_rollup(pid)
+            if stats is not None:
+                report[f"{role}:{pid}"] = stats
+    return report
+
+
+def print_memory_report(master_pid, weights_mb=None):
+    report = memory_report(master_pid)
+    print("[PREFORK] Memory (MiB)      RSS      PSS   shared  private")
+    for name, r in report.items():
+        print(f"[PREFORK]   {name:16s} {r['rss']:8.1f} {r['pss']:8.1f} {r['shared']:8.1f} {r['private']:8.1f}")
+    total_pss = sum(r["pss"] for r in report.values())
+    total_rss = sum(r["rss"] for r in report.values())
+    print(f"[PREFORK]   total PSS {total_pss:.1f} MiB vs total RSS {total_rss:.1f} MiB")
+    if weights_mb:
+        workers = max(0, len(report) - 1)
+        print(
+            f"[PREFORK]   weights {weights_mb:.1f} MiB; duplicated per worker would add "
+            f"{weights_mb * workers:.1f} MiB"
+        )
+
+
+def _worker_main(sock, app_module, threads, threaded):
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set in this process
+
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from werkzeug.serving import make_server
+
+    app_module.start_process_services()
+
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app_module.app, threaded=threaded, fd=sock.fileno())
+    print(f"[PREFORK] Worker {os.getpid()} serving with {threads} intra-op thread(s)")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "2")))
+    parser.add_argument("--threads-per-worker", type=int, default=0,
+                        help="intra-op threads per worker (default: cpus // workers)")
+    parser.add_argument("--share-memory", action="store_true",
+                        help="move weights to shared memory tensors before forking")
+    parser.add_argument("--no-request-threads", action="store_true",
+                        help="serve one request at a time per worker")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="print a per-process memory report once workers are up")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("[PREFORK] os.fork is not available on this platform; use python app.py instead")
+        return 1
+
+    # The model must be fully loaded before forking
+    os.environ["FAST_START"] = "0"
+    os.environ["SERVE_PREFORK"] = "1"
+    os.environ["SERVE_PREFORK_WORKERS"] = str(max(1, args.workers))
+    import app as app_module
+
+    model = app_module.model
+    if args.share_memory:
+        model.share_memory()
+        print("[PREFORK] Model weights moved to shared memory")
+    weights_mb = sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+
+    cpus = os.cpu_count() or 1
+    threads = args.threads_per_worker or max(1, cpus // max(1, args.workers))
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+
+    # Keep the garbage collector from touching (and un-sharing) objects created so far
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _worker_main(sock, app_module, threads, not args.no_request_threads)
+            finally:
+                os._exit(1)
+        workers[pid] = time.time()
+
+    for _ in range(args.workers):
+        spawn()
+
+    print(f"[PREFORK] Master {os.getpid()} serving http://{args.host}:{args.port} with {args.workers} workers")
+
+    stopping = False
+
+    def stop(signum, frame):  # pylint: disable=unused-argument
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    if args.memory_report:
+        time.sleep(2)
+        print_memory_report(os.getpid(), weights_mb)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.pop(pid, None)
+        if not stopping:
+            print(f"[PREFORK] Worker {pid} exited ({status}), restarting")
+            time.sleep(0.5)
+            spawn()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.005)
+
+
+def enqueue(controller, user, label, admitted):
+    """Start a thread that queues for a slot and records ``label`` once admitted."""
+
+    queued_before = controller.queued
+    thread = threading.Thread(target=lambda: (controller.acquire(user), admitted.append(label)), daemon=True)
+    thread.start()
+    wait_until(lambda: controller.queued == queued_before + 1)
+    return thread
+
+
+def test_admits_immediately_below_the_limit():
+    controller = AdmissionController("predict", max_concurrent=2, max_queue=4, max_queue_per_user=2)
+
+    assert controller.acquire("alice") == 0.0
+    assert controller.acquire("bob") == 0.0
+    assert controller.stats()["in_flight"] == 2
+
+
+def test_slots_are_handed_out_round_robin_across_users():
+    controller = AdmissionController("predict", max_concurrent=1, max_queue=10, max_queue_per_user=5)
+    controller.acquire("holder")
+
+    admitted = []
+    threads = [enqueue(controller, "alice", f"alice-{i}", admitted) for i in range(3)]
+    threads += [enqueue(controller, "bob", f"bob-{i}", admitted) for i in range(2)]
+
+    for expected in range(1, 6):
+        controller.release(0.01)
+        wait_until(lambda: len(admitted) == expected)
+    for thread in threads:
+        thread.join(1.0)
+
+    # Alice queued a burst first, but Bob is served every other slot
+    assert admitted == ["alice-0", "bob-0", "alice-1", "bob-1", "alice-2"]
+    stats = controller.stats()
+    assert stats["queued"] == 0
+    assert stats["in_flight"] == 1  # the last admitted request still holds the slot
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    controller = AdmissionController("predict", max_concurrent=1, max_queue=1, max_queue_per_user=1)
+    controller.acquire("holder")
+    enqueue(controller, "alice", "alice-0", [])
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire("bob")
+
+    assert "queue is full" in excinfo.value.reason
+    assert excinfo.value.retry_after >= 1
+    assert controller.stats()["rejected_total"]["queue_full"] == 1
+
+
+def test_per_user_queue_limit():
+    controller = AdmissionController("predict", max_concurrent=1, max_queue=10, max_queue_per_user=1)
+    controller.acquire("holder")
+    enqueue(controller, "alice", "alice-0", [])
+
+    with pytest.raises(AdmissionRejected):
+        controller.acquire("alice")
+    # Other users can still queue
+    enqueue(controller, "bob", "bob-0", [])
+
+    assert controller.stats()["rejected_total"]["user_queue_full"] == 1
+    assert controller.queued == 2
+
+
+def test_queue_timeout_withdraws_the_waiter():
+    controller = AdmissionController("predict", max_concurrent=1, max_queue=4, max_queue_per_user=4,
+                                     queue_timeout=0.05)
+    controller.acquire("holder")
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire("alice")
+
+    assert "Timed out" in excinfo.value.reason
+    assert controller.queued == 0
+    assert controller.stats()["rejected_total"]["timeout"] == 1
+
+    # The timed-out waiter must not receive the freed slot
+    controller.release(0.01)
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_retry_after_follows_the_service_rate():
+    controller = AdmissionController("predict", max_concurrent=1, max_queue=1, max_queue_per_user=1)
+    for _ in range(4):
+        controller.acquire("alice")
+        controller.release(3.0)
+
+    controller.acquire("holder")
+    enqueue(controller, "alice", "alice-0", [])
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire("bob")
+
+    # One in flight + one queued at 3 s each on a single slot
+    assert excinfo.value.retry_after == 6
+
+
+def test_admit_context_releases_on_error():
+    controller = AdmissionController("predict", max_concurrent=1, max_queue=0, max_queue_per_user=0)
+
+    with pytest.raises(ValueError):
+        with controller.admit("alice"):
+            raise ValueError("handler failed")
+
+    assert controller.stats()["in_flight"] == 0
+    with controller.admit("bob"):
+        assert controller.stats()["in_flight"] == 1
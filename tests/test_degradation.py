@@ -0,0 +1,64 @@
+import pytest
+
+import degradation
+from degradation import DegradationPolicy
+
+
+def levels_for(policy, queue_depths):
+    return [len(policy.shed_stages(depth)) for depth in queue_depths]
+
+
+def test_levels_follow_queue_depth_with_hysteresis():
+    # Level 1 at pressure 1.0 (depth 4), level 2 at 1.5 (depth 6); a level is
+    # only left below 0.7x its threshold
+    policy = DegradationPolicy(latency_budget_s=5.0, queue_budget=4, thresholds=(1.0, 1.5), recovery_ratio=0.7)
+
+    depths = [0, 4, 5, 6, 5, 4, 3, 2, 0]
+    assert levels_for(policy, depths) == [0, 1, 1, 2, 2, 1, 1, 0, 0]
+
+
+def test_escalates_straight_to_the_highest_crossed_level():
+    policy = DegradationPolicy(queue_budget=4, thresholds=(1.0, 1.5))
+
+    assert policy.shed_stages(8) == ["heatmap", "ensemble"]
+    assert policy.stats()["level"] == 2
+
+
+def test_no_flapping_around_a_threshold():
+    policy = DegradationPolicy(queue_budget=4, thresholds=(1.0, 1.5), recovery_ratio=0.7)
+
+    # Pressure alternates between 1.0 and 0.75, both above the 0.7 recovery point
+    assert levels_for(policy, [4, 3, 4, 3, 4, 3]) == [1] * 6
+
+
+def test_latency_pressure_decays_after_the_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(degradation.time, "monotonic", lambda: now[0])
+    policy = DegradationPolicy(latency_budget_s=2.0, queue_budget=100, thresholds=(1.0, 1.5), window_s=30.0)
+
+    for _ in range(5):
+        policy.observe(3.0)  # 1.5x the latency budget
+    assert policy.shed_stages(0) == ["heatmap", "ensemble"]
+
+    now[0] += 31.0  # every sample has left the window
+    assert policy.shed_stages(0) == []
+    assert policy.stats()["recent_mean_latency_s"] == 0.0
+
+
+def test_shed_counts_and_disabled_policy():
+    policy = DegradationPolicy(queue_budget=4, thresholds=(1.0, 1.5))
+    policy.shed_stages(4)
+    policy.shed_stages(6)
+
+    assert policy.stats()["shed_total"] == {"heatmap": 2, "ensemble": 1}
+
+    disabled = DegradationPolicy(queue_budget=1, enabled=False)
+    assert disabled.shed_stages(100) == []
+    assert disabled.stats()["level"] == 0
+
+
+@pytest.mark.parametrize("depth, level", [(3, 0), (4, 1), (6, 2)])
+def test_thresholds(depth, level):
+    policy = DegradationPolicy(queue_budget=4, thresholds=(1.0, 1.5))
+    policy.shed_stages(depth)
+    assert policy.stats()["level"] == level
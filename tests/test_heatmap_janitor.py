@@ -0,0 +1,40 @@
+import os
+import time
+
+from heatmap_janitor import HeatmapJanitor
+
+
+def write_heatmap(root, name):
+    path = os.path.join(root, "image_heatmaps", name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"jpeg")
+    return path
+
+
+def test_track_wakes_an_idle_janitor(tmp_path):
+    janitor = HeatmapJanitor(str(tmp_path), max_age_s=0.2, idle_interval_s=300.0).start()
+    try:
+        time.sleep(0.1)  # empty index: the thread is in its 300 s idle wait
+        path = write_heatmap(str(tmp_path), "a.jpg")
+        janitor.track(path)
+
+        deadline = time.monotonic() + 5.0
+        while os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert not os.path.exists(path)
+    finally:
+        janitor.stop()
+
+
+def test_run_once_deletes_only_expired_files(tmp_path):
+    janitor = HeatmapJanitor(str(tmp_path), max_age_s=60.0)
+    old = write_heatmap(str(tmp_path), "old.jpg")
+    new = write_heatmap(str(tmp_path), "new.jpg")
+    os.utime(old, (time.time() - 120, time.time() - 120))
+    janitor.rebuild()
+
+    assert janitor.run_once() == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+    assert janitor.stats()["indexed"] == 1
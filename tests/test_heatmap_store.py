@@ -0,0 +1,60 @@
+import threading
+
+import numpy as np
+import pytest
+
+from heatmap_store import HeatmapExpired, HeatmapStore
+
+
+IMAGE = np.zeros((224, 224, 3), dtype=np.uint8)
+
+
+def render(image, target_index, heatmap):
+    return f"overlay-{target_index}".encode(), "image/jpeg"
+
+
+def test_concurrent_hits_are_all_counted():
+    store = HeatmapStore()
+    token = store.put(IMAGE, 1)
+    store.render(token, render)
+
+    def fetch():
+        for _ in range(500):
+            store.render(token, render)
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = store.stats()
+    assert stats["rendered_total"] == 1
+    assert stats["memoized_hits"] == 8 * 500
+
+
+def test_unknown_token_is_expired():
+    with pytest.raises(HeatmapExpired):
+        HeatmapStore().render("missing", render)
+
+
+def test_shared_directory_serves_tokens_from_other_processes(tmp_path):
+    saved = []
+    issuer = HeatmapStore(directory=str(tmp_path), on_saved=saved.append)
+    other = HeatmapStore(directory=str(tmp_path))
+    token = issuer.put(IMAGE, 2)
+
+    calls = []
+
+    def counting_render(image, target_index, heatmap):
+        calls.append(target_index)
+        return render(image, target_index, heatmap)
+
+    assert other.render(token, counting_render) == (b"overlay-2", "image/jpeg")
+    # The issuer picks up the other store's rendered overlay instead of rendering again
+    assert issuer.render(token, counting_render) == (b"overlay-2", "image/jpeg")
+    assert calls == [2]
+    assert len(saved) == 1
+
+    with pytest.raises(HeatmapExpired):
+        other.render("../" + token, counting_render)
@@ -0,0 +1,39 @@
+import os
+
+import torch
+
+from inference_backends import TorchScriptBackend, create_backend
+
+
+def small_model():
+    torch.manual_seed(0)
+    return torch.nn.Sequential(
+        torch.nn.Conv2d(3, 4, 3, stride=4),
+        torch.nn.ReLU(),
+        torch.nn.AdaptiveAvgPool2d(1),
+        torch.nn.Flatten(),
+        torch.nn.Linear(4, 3),
+    ).eval()
+
+
+def test_torchscript_backend_reloads_its_cached_module(tmp_path, capsys):
+    checkpoint = tmp_path / "vit3class.pth"
+    checkpoint.write_bytes(b"checkpoint")
+    cache_dir = str(tmp_path / "cache")
+    model = small_model()
+    x = torch.rand(2, 3, 224, 224)
+
+    first = create_backend("torchscript", model, "cpu", str(checkpoint), cache_dir)
+    assert isinstance(first, TorchScriptBackend)
+    assert any(name.startswith("vit3class_torchscript_cpu_") for name in os.listdir(cache_dir))
+    capsys.readouterr()
+
+    second = create_backend("torchscript", model, "cpu", str(checkpoint), cache_dir)
+    out = capsys.readouterr().out
+
+    assert isinstance(second, TorchScriptBackend)
+    assert "Loaded cached TorchScript module" in out
+    assert "Failed to load" not in out
+    assert "Cached artifact" not in out
+    torch.testing.assert_close(second(x), model(x))
+    torch.testing.assert_close(second(x), first(x))
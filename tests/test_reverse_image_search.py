@@ -0,0 +1,193 @@
+import threading
+import time
+
+import pytest
+
+from reverse_image_search import DeadlineExceeded, ReverseSearchFanout, SharedCall
+
+
+def links(*urls):
+    return [{"title": url, "link": url} for url in urls]
+
+
+def fast(ctx):
+    return links("https://a.example/1", "https://shared.example/x")
+
+
+def failing(ctx):
+    raise RuntimeError("provider down")
+
+
+def slow_provider(delay=1.0, result=None):
+    """Provider that sleeps through two "HTTP calls"; records which ones it started."""
+
+    calls = []
+
+    def provider(ctx):
+        for step in ("first", "second"):
+            ctx.timeout(30)  # what a real provider sizes its next request with
+            calls.append(step)
+            time.sleep(delay)
+        return result if result is not None else links("https://slow.example/1", "https://shared.example/x")
+
+    return provider, calls
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def fanout():
+    return ReverseSearchFanout(max_workers=4, deadline_s=5.0)
+
+
+def test_first_mode_returns_the_fast_provider_and_cancels_the_slow_one(fanout):
+    slow, _ = slow_provider(delay=0.5)
+    start = time.monotonic()
+
+    result = fanout.search([("slow", slow), ("failing", failing), ("fast", fast)], fanout.context(), "first")
+
+    assert time.monotonic() - start < 0.5
+    assert result["winner"] == "fast"
+    assert result["engines"] == ["fast"]
+    assert result["results"] == fast(None)
+    providers = result["providers"]
+    assert providers["fast"]["status"] == "ok"
+    assert providers["fast"]["count"] == 2
+    assert providers["failing"]["status"] == "error"
+    assert providers["failing"]["error"] == "RuntimeError: provider down"
+    assert providers["slow"]["status"] == "cancelled"
+    assert providers["slow"]["latency_ms"] is None
+
+
+def test_cancelled_provider_stops_before_its_next_call(fanout):
+    slow, slow_calls = slow_provider(delay=0.3)
+
+    fanout.search([("slow", slow), ("fast", fast)], fanout.context(), "first")
+
+    # The in-flight "call" finishes, but the follow-up ctx.timeout() raises
+    wait_until(lambda: fanout.stats()["providers"].get("slow", {}).get("calls") == 1)
+    assert slow_calls == ["first"]
+
+
+def test_merge_mode_waits_for_all_and_dedupes_in_provider_order(fanout):
+    slow, _ = slow_provider(delay=0.05)
+
+    result = fanout.search([("slow", slow), ("failing", failing), ("fast", fast)], fanout.context(), "merge")
+
+    assert result["winner"] == "fast"
+    assert result["engines"] == ["slow", "fast"]
+    assert [r["link"] for r in result["results"]] == [
+        "https://slow.example/1", "https://shared.example/x", "https://a.example/1",
+    ]
+    assert {name: p["status"] for name, p in result["providers"].items()} == {
+        "slow": "ok", "failing": "error", "fast": "ok",
+    }
+
+
+def test_deadline_expiry_reports_timeout_and_no_winner(fanout):
+    slow, _ = slow_provider(delay=1.0)
+    start = time.monotonic()
+
+    result = fanout.search([("slow", slow), ("failing", failing)], fanout.context(0.2), "first")
+
+    assert time.monotonic() - start < 0.8
+    assert result["winner"] is None
+    assert result["results"] == []
+    assert result["providers"]["slow"]["status"] == "timeout"
+    assert result["providers"]["failing"]["status"] == "error"
+    assert fanout.stats()["no_result"] == 1
+
+
+def test_stats_count_wins_and_win_rate(fanout):
+    for _ in range(3):
+        fanout.search([("failing", failing), ("fast", fast)], fanout.context(), "first")
+    fanout.search([("failing", failing)], fanout.context(), "first")
+
+    stats = fanout.stats()
+    assert stats["searches"] == 4
+    assert stats["no_result"] == 1
+    assert stats["providers"]["fast"]["wins"] == 3
+    assert stats["providers"]["fast"]["win_rate"] == 1.0
+    assert stats["providers"]["failing"]["calls"] == 4
+    assert stats["providers"]["failing"]["errors"] == 4
+    assert stats["providers"]["failing"]["win_rate"] == 0.0
+
+
+def test_unknown_mode_is_rejected(fanout):
+    with pytest.raises(ValueError):
+        fanout.search([("fast", fast)], fanout.context(), "fastest")
+
+
+def test_shared_call_runs_once_for_every_provider(fanout):
+    runs = []
+
+    def upload(ctx):
+        runs.append(threading.current_thread().name)
+        time.sleep(0.1)
+        return "https://tmp.example/a.jpg"
+
+    shared = SharedCall(upload)
+    assert not shared.done()
+    assert shared.value() is None
+
+    result = fanout.search([("a", lambda c: links(shared.get(c) + "#a")),
+                            ("b", lambda c: links(shared.get(c) + "#b"))], fanout.context(), "merge")
+
+    assert len(runs) == 1
+    assert result["engines"] == ["a", "b"]
+    assert shared.done()
+    assert shared.value() == "https://tmp.example/a.jpg"
+
+
+def test_shared_call_waiters_give_up_when_the_search_is_cancelled(fanout):
+    release = threading.Event()
+    shared = SharedCall(lambda c: release.wait(5.0))
+    waiter_done = threading.Event()
+
+    def needs_upload(ctx):
+        try:
+            return links(str(shared.get(ctx)))
+        finally:
+            waiter_done.set()
+
+    ctx = fanout.context()
+    runner = threading.Thread(target=shared.get, args=(ctx,), daemon=True)
+    runner.start()
+    wait_until(lambda: shared._started)
+
+    result = fanout.search([("waiter", needs_upload), ("fast", fast)], ctx, "first")
+
+    assert result["winner"] == "fast"
+    # The waiter's pool thread is released long before the upload finishes
+    assert waiter_done.wait(1.0)
+    assert not shared.done()
+    release.set()
+    runner.join(1.0)
+    assert shared.done()
+
+
+def test_shared_call_waiter_times_out_at_the_deadline():
+    shared = SharedCall(lambda c: time.sleep(1.0))
+    ctx = ReverseSearchFanout(deadline_s=0.2).context()
+    threading.Thread(target=shared.get, args=(ctx,), daemon=True).start()
+    wait_until(lambda: shared._started)
+
+    with pytest.raises(DeadlineExceeded):
+        shared.get(ctx)
+
+
+def test_shared_call_error_reaches_every_caller():
+    shared = SharedCall(failing)
+    ctx = ReverseSearchFanout().context()
+
+    with pytest.raises(RuntimeError):
+        shared.get(ctx)
+    with pytest.raises(RuntimeError):
+        shared.get(ctx)
+    assert not shared.done()
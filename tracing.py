@@ -0,0 +1,145 @@
+"""Per-request traces: request IDs, stage timings and a slow-request log.
+
+Every request gets a ``RequestTrace`` (its ID is taken from a sane
+incoming ``X-Request-ID`` header or generated). Stages timed while the
+request runs are added to the trace of the current thread with
+``record_stage``; the app turns the trace into the ``X-Request-ID`` and
+``Server-Timing`` response headers and, when asked, a JSON timing block.
+
+``SlowRequestLog`` keeps (a sample of) the traces of requests slower than
+a threshold: the most recent ones in memory, all of them optionally as
+JSON Lines in a file.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+_local = threading.local()
+
+
+class RequestTrace:
+    """Request ID plus accumulated time per stage (a stage may run several times)."""
+
+    __slots__ = ("request_id", "start", "stages")
+
+    def __init__(self, request_id: Optional[str] = None):
+        # Client-supplied IDs are kept so traces can be joined across services
+        self.request_id = request_id if request_id and _REQUEST_ID_RE.match(request_id) else uuid.uuid4().hex
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total_s: float) -> str:
+        """``Server-Timing`` header value, durations in milliseconds."""
+
+        entries = [f"{name};dur={seconds * 1000.0:.1f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={total_s * 1000.0:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self, total_s: float) -> dict:
+        return {
+            "request_id": self.request_id,
+            "total_ms": round(total_s * 1000.0, 2),
+            "stages_ms": {name: round(seconds * 1000.0, 2) for name, seconds in self.stages.items()},
+        }
+
+
+def start_trace(request_id: Optional[str] = None) -> RequestTrace:
+    """Begin the trace of the request handled by this thread."""
+
+    trace = RequestTrace(request_id)
+    _local.trace = trace
+    return trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return getattr(_local, "trace", None)
+
+
+def end_trace() -> None:
+    _local.trace = None
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Add a stage duration to the current request's trace (no-op outside a request)."""
+
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+class SlowRequestLog:
+    """Keeps the traces of requests slower than ``threshold_s``.
+
+    Only a ``sample_rate`` fraction of slow requests is kept, so a slow
+    period cannot flood the log. Entries go to an in-memory ring of
+    ``keep`` entries and, when ``path`` is set, are appended to it as JSON
+    Lines (otherwise printed).
+    """
+
+    def __init__(self, threshold_s: float = 2.0, sample_rate: float = 1.0, path: Optional[str] = None,
+                 keep: int = 100):
+        self.threshold_s = threshold_s
+        self.sample_rate = sample_rate
+        self.path = path
+        self._lock = threading.Lock()
+        self._recent: Deque[dict] = deque(maxlen=max(1, keep))
+        self._slow = 0
+        self._logged = 0
+
+    def observe(self, trace: RequestTrace, endpoint: str, status: int, total_s: float) -> bool:
+        """Log the trace if the request was slow and sampled; return whether it was logged."""
+
+        if total_s < self.threshold_s:
+            return False
+        with self._lock:
+            self._slow += 1
+            if random.random() >= self.sample_rate:
+                return False
+            self._logged += 1
+            entry = {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "endpoint": endpoint,
+                "status": status,
+                **trace.to_dict(total_s),
+            }
+            self._recent.append(entry)
+            if self.path:
+                try:
+                    with open(self.path, "a") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print(f"[TRACE] Could not write slow-request log {self.path}: {e}")
+            else:
+                print(f"[TRACE] Slow request: {json.dumps(entry)}")
+        return True
+
+    def recent(self) -> List[dict]:
+        with self._lock:
+            return list(self._recent)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold_s * 1000.0,
+                "sample_rate": self.sample_rate,
+                "slow_total": self._slow,
+                "logged_total": self._logged,
+                "recent": list(self._recent),
+            }
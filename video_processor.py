@@ -10,25 +10,55 @@ import torch
 import torch.nn.functional as F
 from torchvision import transforms
 import os
+import time
 from pathlib import Path
 
-from gradcam_vit import generate_vit_gradcam_map, overlay_heatmap_on_image
+from gradcam_vit import generate_vit_gradcam_map, overlay_heatmap_on_image, overlay_heatmaps_batch
+from metrics import VIDEO_STAGE_SECONDS
+
+# How per-frame heatmaps are stored: one file per frame, one sprite sheet
+# image for the whole video, or one short video with a frame per sample
+HEATMAP_OUTPUT_MODES = ('frames', 'sprite', 'video')
+
+# Sprite sheets are at most this many tiles wide
+SPRITE_MAX_COLUMNS = 6
+
+# Codecs tried in order for the heatmap video: WebM/VP8 plays in browsers,
+# MPEG-4 Part 2 is the fallback every OpenCV build can write
+HEATMAP_VIDEO_CODECS = (('VP80', '.webm'), ('mp4v', '.mp4'))
+
 
 class VideoProcessor:
     """Process video files for deepfake detection"""
     
-    def __init__(self, model, device, class_names, transform):
+    def __init__(self, model, device, class_names, transform, gradcam_model=None, on_heatmap_saved=None,
+                 heatmap_writer=None, heatmap_output='frames', heatmap_video_fps=2.0):
         """
         Args:
-            model: PyTorch model
+            model: PyTorch model or inference backend used for predictions
             device: torch device (cuda/cpu)
             class_names: dict mapping class indices to names
             transform: preprocessing transform
+            gradcam_model: fp32 model used for Grad-CAM (defaults to ``model``)
+            on_heatmap_saved: optional callback(path) for every heatmap file
+                written (used to register files with the heatmap janitor)
+            heatmap_writer: optional ``HeatmapWriter`` that encodes and saves
+                overlays in the background; without it they are saved inline
+                as PNG
+            heatmap_output: one of ``HEATMAP_OUTPUT_MODES``
+            heatmap_video_fps: playback rate of the ``video`` heatmap output
         """
+        if heatmap_output not in HEATMAP_OUTPUT_MODES:
+            raise ValueError(f"heatmap_output must be one of {HEATMAP_OUTPUT_MODES}, got '{heatmap_output}'")
         self.model = model
         self.device = device
         self.class_names = class_names
         self.transform = transform
+        self.gradcam_model = gradcam_model if gradcam_model is not None else model
+        self.on_heatmap_saved = on_heatmap_saved
+        self.heatmap_writer = heatmap_writer
+        self.heatmap_output = heatmap_output
+        self.heatmap_video_fps = heatmap_video_fps
     
     def extract_frames(self, video_path, sample_rate=1, max_frames=30):
         """Smart frame extraction from video.
@@ -104,7 +134,8 @@ class VideoProcessor:
         cap.release()
         return info
     
-    def process_frame(self, frame, save_heatmap: bool = False, heatmap_path: str | None = None):
+    def process_frame(self, frame, save_heatmap: bool = False, heatmap_path: str | None = None,
+                      keep_heatmap: bool = False):
         """
         Process single frame and get predictions.
 
@@ -113,10 +144,27 @@ class VideoProcessor:
         Args:
             frame: numpy array (BGR)
             save_heatmap: whether to generate and save Grad-CAM overlay
-            heatmap_path: full file path where the overlay will be saved
+            heatmap_path: file path for the overlay, without extension (the
+                extension follows the heatmap writer's format, ``.png`` inline)
+            keep_heatmap: instead of rendering and saving the overlay, return
+                ``heatmap_raw`` = (frame resized to the heatmap, heatmap) so
+                process_video can overlay all frames in one batch
         
         Returns:
             dict with predictions, probabilities, and optional heatmap path
+            (the file is on disk by the time this returns).
+        """
+        result, heatmap_future = self._process_frame(frame, save_heatmap, heatmap_path, keep_heatmap)
+        self._wait_heatmap(result, heatmap_future)
+        return result
+
+    def _process_frame(self, frame, save_heatmap, heatmap_path, keep_heatmap):
+        """process_frame without waiting for the heatmap writer.
+
+        Returns:
+            ``(result, heatmap_future)``; the future (None unless the heatmap
+            writer is saving an overlay) resolves once ``result['heatmap_path']``
+            is on disk.
         """
         # Convert BGR to RGB
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -126,10 +174,11 @@ class VideoProcessor:
         pil_image = Image.fromarray(frame_rgb)
         
         # Apply transform
-        tensor = self.transform(pil_image).unsqueeze(0).to(self.device)
+        with VIDEO_STAGE_SECONDS.time('preprocess'):
+            tensor = self.transform(pil_image).unsqueeze(0).to(self.device)
         
         # Predict
-        with torch.no_grad():
+        with VIDEO_STAGE_SECONDS.time('forward'), torch.no_grad():
             logits = self.model(tensor)
             probs = F.softmax(logits, dim=1)[0]
         
@@ -139,23 +188,40 @@ class VideoProcessor:
 
         # Optional Grad-CAM heatmap
         heatmap_file = None
-        if save_heatmap and heatmap_path is not None:
+        heatmap_future = None
+        heatmap_raw = None
+        if save_heatmap and (heatmap_path is not None or keep_heatmap):
             try:
-                heatmap = generate_vit_gradcam_map(
-                    model=self.model,
-                    device=self.device,
-                    pil_image=pil_image,
-                    transform=self.transform,
-                    target_index=pred_idx,
-                )
-                overlay = overlay_heatmap_on_image(pil_image, heatmap, alpha=0.5)
-                os.makedirs(os.path.dirname(heatmap_path), exist_ok=True)
-                overlay.save(heatmap_path)
-                heatmap_file = heatmap_path
+                with VIDEO_STAGE_SECONDS.time('gradcam'):
+                    heatmap = generate_vit_gradcam_map(
+                        model=self.gradcam_model,
+                        device=self.device,
+                        pil_image=pil_image,
+                        transform=self.transform,
+                        target_index=pred_idx,
+                    )
+                if keep_heatmap:
+                    # Overlaid later, in one batch (see process_video)
+                    h, w = heatmap.shape
+                    heatmap_raw = (cv2.resize(frame_rgb, (w, h), interpolation=cv2.INTER_AREA), heatmap)
+                else:
+                    overlay_start = time.perf_counter()
+                    overlay = overlay_heatmap_on_image(pil_image, heatmap, alpha=0.5)
+                    if self.heatmap_writer is not None:
+                        heatmap_future = self.heatmap_writer.submit(overlay, heatmap_path, self.on_heatmap_saved)
+                        heatmap_file = heatmap_path + self.heatmap_writer.extension
+                    else:
+                        heatmap_file = heatmap_path + '.png'
+                        os.makedirs(os.path.dirname(heatmap_file), exist_ok=True)
+                        overlay.save(heatmap_file)
+                        if self.on_heatmap_saved is not None:
+                            self.on_heatmap_saved(heatmap_file)
+                    VIDEO_STAGE_SECONDS.observe(time.perf_counter() - overlay_start, 'overlay')
             except Exception:
                 heatmap_file = None
+                heatmap_raw = None
         
-        return {
+        result = {
             'predicted_class': self.class_names[pred_idx],
             'confidence': confidence,
             'probabilities': {
@@ -165,8 +231,22 @@ class VideoProcessor:
             'class_index': pred_idx,
             'heatmap_path': heatmap_file,
         }
+        if keep_heatmap:
+            result['heatmap_raw'] = heatmap_raw
+        return result, heatmap_future
+
+    @staticmethod
+    def _wait_heatmap(result, heatmap_future):
+        """Wait for a frame's overlay to be written; clears ``heatmap_path`` if it failed."""
+        if heatmap_future is None:
+            return
+        try:
+            heatmap_future.result()
+        except Exception as e:
+            print(f"[VIDEO] Failed to save heatmap {result['heatmap_path']}: {e}")
+            result['heatmap_path'] = None
     
-    def process_video(self, video_path, sample_rate=2, max_frames=30, callback=None):
+    def process_video(self, video_path, sample_rate=2, max_frames=30, callback=None, heatmap_output=None):
         """Process entire video and get detection results.
 
         Uses *smart* frame selection under the hood:
@@ -178,36 +258,52 @@ class VideoProcessor:
             sample_rate: kept for compatibility; not the primary control
             max_frames: max frames to analyze
             callback: function called with progress info
+            heatmap_output: overrides the processor's ``heatmap_output`` mode
 
         Returns:
-            dict with analysis results
+            dict with analysis results. ``heatmaps`` describes the heatmap
+            output: for ``sprite`` the sheet path plus each frame's tile
+            offset, for ``video`` the video path and its frame rate (frame N
+            is shown at ``(N - 1) / fps`` seconds).
         """
+        heatmap_output = heatmap_output or self.heatmap_output
+        if heatmap_output not in HEATMAP_OUTPUT_MODES:
+            raise ValueError(f"heatmap_output must be one of {HEATMAP_OUTPUT_MODES}, got '{heatmap_output}'")
         print(f"[VIDEO] Processing: {video_path}")
         
+        video_start = time.perf_counter()
+
         # Get video info
         info = self.get_video_info(video_path)
         print(f"[VIDEO] Info: {info['frame_count']} frames @ {info['fps']} fps")
         
         # Extract frames using smart uniform sampling
-        frames = self.extract_frames(video_path, sample_rate, max_frames)
+        with VIDEO_STAGE_SECONDS.time('extract_frames'):
+            frames = self.extract_frames(video_path, sample_rate, max_frames)
         print(f"[VIDEO] Extracted {len(frames)} frames for analysis")
         
         if not frames:
             raise ValueError("No frames extracted from video")
         
-        # Directory for frame heatmaps for this video
+        # Directory for frame heatmaps for this video (sprite / video modes
+        # write a single file next to it instead)
         video_stem = Path(video_path).stem
         heatmap_root = os.path.join('uploads', 'video_heatmaps', video_stem)
-        os.makedirs(heatmap_root, exist_ok=True)
+        per_frame = heatmap_output == 'frames'
+        if per_frame:
+            os.makedirs(heatmap_root, exist_ok=True)
         
         # Process each frame
         results = []
+        heatmap_futures = []
         frame_predictions = []
         
         for i, frame in enumerate(frames):
-            heatmap_path = os.path.join(heatmap_root, f"frame_{i+1}.png")
-            result = self.process_frame(frame, save_heatmap=True, heatmap_path=heatmap_path)
+            heatmap_path = os.path.join(heatmap_root, f"frame_{i+1}") if per_frame else None
+            result, heatmap_future = self._process_frame(frame, save_heatmap=True, heatmap_path=heatmap_path,
+                                                         keep_heatmap=not per_frame)
             results.append(result)
+            heatmap_futures.append(heatmap_future)
             frame_predictions.append(result['class_index'])
             
             # Callback for progress
@@ -216,14 +312,120 @@ class VideoProcessor:
             
             print(f"[VIDEO] Frame {i+1}/{len(frames)}: {result['predicted_class']} ({result['confidence']:.1f}%)")
         
+        # Overlays were encoded in the background while later frames ran;
+        # make sure they are all on disk before returning their paths
+        wait_start = time.perf_counter()
+        for result, heatmap_future in zip(results, heatmap_futures):
+            self._wait_heatmap(result, heatmap_future)
+        VIDEO_STAGE_SECONDS.observe(time.perf_counter() - wait_start, 'heatmap_wait')
+
+        if per_frame:
+            heatmaps = {'mode': 'frames'}
+        else:
+            write_start = time.perf_counter()
+            raw = [result.pop('heatmap_raw') for result in results]
+            try:
+                overlays = self._overlay_batch(raw)
+                if heatmap_output == 'sprite':
+                    heatmaps = self._write_heatmap_sprite(overlays, heatmap_root + '_sprite')
+                else:
+                    heatmaps = self._write_heatmap_video(overlays, heatmap_root + '_heatmaps')
+            except Exception as e:
+                print(f"[VIDEO] Failed to write {heatmap_output} heatmaps: {e}")
+                heatmaps = {'mode': heatmap_output, 'path': None}
+            VIDEO_STAGE_SECONDS.observe(time.perf_counter() - write_start, 'heatmap_write')
+
         # Aggregate results
         aggregated = self._aggregate_results(results, frame_predictions)
+        VIDEO_STAGE_SECONDS.observe(time.perf_counter() - video_start, 'total')
         
         return {
             'video_info': info,
             'frames_analyzed': len(frames),
             'frame_results': results,
-            'aggregated': aggregated
+            'aggregated': aggregated,
+            'heatmaps': heatmaps,
+        }
+
+    @staticmethod
+    def _overlay_batch(raw):
+        """Overlay every frame's heatmap in one vectorized call (None where Grad-CAM failed)."""
+        kept = [i for i, r in enumerate(raw) if r is not None]
+        overlays = [None] * len(raw)
+        if kept:
+            images = np.stack([raw[i][0] for i in kept])
+            heatmaps = np.stack([raw[i][1] for i in kept])
+            for i, overlay in zip(kept, overlay_heatmaps_batch(images, heatmaps, alpha=0.5)):
+                overlays[i] = overlay
+        return overlays
+
+    def _write_heatmap_sprite(self, overlays, path_stem):
+        """Pack frame overlays into one grid image; returns the sprite index."""
+        tiles = [(i, np.asarray(o)) for i, o in enumerate(overlays) if o is not None]
+        if not tiles:
+            return {'mode': 'sprite', 'path': None}
+
+        tile_h, tile_w = tiles[0][1].shape[:2]
+        columns = min(SPRITE_MAX_COLUMNS, len(tiles))
+        rows = (len(tiles) + columns - 1) // columns
+        sheet = np.zeros((rows * tile_h, columns * tile_w, 3), dtype=np.uint8)
+
+        index = []
+        for n, (i, tile) in enumerate(tiles):
+            x, y = (n % columns) * tile_w, (n // columns) * tile_h
+            sheet[y:y + tile_h, x:x + tile_w] = tile[:tile_h, :tile_w]
+            index.append({'frame': i + 1, 'x': x, 'y': y})
+
+        from PIL import Image
+        sprite = Image.fromarray(sheet)
+        os.makedirs(os.path.dirname(path_stem), exist_ok=True)
+        if self.heatmap_writer is not None:
+            path = self.heatmap_writer.submit(sprite, path_stem, self.on_heatmap_saved).result()
+        else:
+            path = path_stem + '.png'
+            sprite.save(path)
+            if self.on_heatmap_saved is not None:
+                self.on_heatmap_saved(path)
+
+        return {
+            'mode': 'sprite',
+            'path': path,
+            'tile_width': tile_w,
+            'tile_height': tile_h,
+            'columns': columns,
+            'tiles': index,
+        }
+
+    def _write_heatmap_video(self, overlays, path_stem):
+        """Encode frame overlays as one short video; returns its description."""
+        frames = [(i, np.asarray(o)) for i, o in enumerate(overlays) if o is not None]
+        if not frames:
+            return {'mode': 'video', 'path': None}
+
+        height, width = frames[0][1].shape[:2]
+        os.makedirs(os.path.dirname(path_stem), exist_ok=True)
+        for fourcc, ext in HEATMAP_VIDEO_CODECS:
+            path = path_stem + ext
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), self.heatmap_video_fps, (width, height))
+            if writer.isOpened():
+                break
+            writer.release()
+        else:
+            raise RuntimeError("No usable video codec for heatmap output")
+
+        try:
+            for _, frame in frames:
+                writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+        finally:
+            writer.release()
+        if self.on_heatmap_saved is not None:
+            self.on_heatmap_saved(path)
+
+        return {
+            'mode': 'video',
+            'path': path,
+            'fps': self.heatmap_video_fps,
+            'frames': [i + 1 for i, _ in frames],
         }
     
     def _aggregate_results(self, results, predictions):